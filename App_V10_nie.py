@@ -1,77 +1,25 @@
 import streamlit as st
-import pandas as pd
-import joblib
+import altair as alt
 import numpy as np
 import datetime
+import threading
+
+from inference import threads
+from inference.cases import CASE_INDEX, CaseIndex
+from inference.cube import GENDERS, PredictionCube
+from inference.explain import contributions, get_explainer, top_contributions
+from inference.importance import get_store
+from inference.grid import seasonal_grid
+from inference.labtests import LabTestCatalogue
+from inference.questioning import next_questions
+from inference.reload import ReloadingPipeline
+from inference.surveillance import OutbreakDetector
+from inference.warmup import warm_cache
+from inference.whatif import sensitivity
+from inference.schema import disease_groups, features, months, states, symptom_display_names
 
-# =============================
-# Data definitions
-# =============================
-states = [
-    'Andaman And Nicobar Islands', 'Andhra Pradesh', 'Arunachal Pradesh', 'Assam',
-    'Bihar', 'Chandigarh', 'Chhattisgarh', 'Delhi', 'Goa', 'Gujarat', 'Haryana',
-    'Himachal Pradesh', 'Jammu And Kashmir', 'Jharkhand', 'Karnataka', 'Kerala',
-    'Ladakh', 'Lakshadweep', 'Madhya Pradesh', 'Maharashtra', 'Manipur', 'Meghalaya',
-    'Mizoram', 'Nagaland', 'Odisha', 'Puducherry', 'Punjab', 'Rajasthan', 'Sikkim',
-    'Tamil Nadu', 'Telangana', 'The Dadra And Nagar Haveli And Daman And Diu',
-    'Tripura', 'Uttar Pradesh', 'Uttarakhand', 'West Bengal'
-]
-
-months = {
-    "January": 1, "February": 2, "March": 3, "April": 4,
-    "May": 5, "June": 6, "July": 7, "August": 8,
-    "September": 9, "October": 10, "November": 11, "December": 12
-}
 default_dob = datetime.date.today()
 
-# =============================
-# Disease categories and symptoms
-# =============================
-disease_groups = {
-    "Diarrheal Diseases": [
-        'diarrhoea', 'dia_fever', 'dia_diarrhoea', 'dia_dysentery', 'dia_pain', 'dia_vomiting'
-    ],
-    "Respiratory Infections": [
-        'respiratory_c', 'res_sore', 'res_cough', 'res_rhinorrhoe', 'res_breath', 'res_fever'
-    ],
-    "Fever and Inflammatory Responses": [
-        'fev_fever', 'fev_any_loc_sym', 'rash_mac', 'rash_papule', 'rash_mac_pop',
-        'rash_eschar', 'rash_pustule', 'rash_bullae', 'rash_fev'
-    ],
-    "Jaundice and Hepatic Issues": [
-        'jaundice', 'jau_fever', 'jau_jaundice', 'jau_urine', 'jau_hep',
-        'jau_nausea', 'jau_vomiting', 'jau_abpain'
-    ],
-    "Neurological Symptoms (Encephalitis)": [
-        'encephalitis', 'enc_fever', 'enc_seizures', 'enc_rigidity', 'enc_sensorium',
-        'enc_ment_status', 'enc_somnelen', 'enc_irritab'
-    ],
-    "Hemorrhagic Symptoms": [
-        'hem_fever', 'hem_rigors', 'hem_headache', 'hem_chills', 'hem_malaise',
-        'hem_artharalgia', 'hem_myalgia', 'hem_hemanifestat',
-        'hem_retro_orbital'
-    ],
-    "Conjunctivitis Symptoms": [
-        'conjuctivities', 'con_fever', 'con_redness', 'con_discharge', 'con_scrusting'
-    ]
-}
-
-# ✅ Feature order must match your trained model
-features = [
-    'state_patient', 'gender', 'durationofillness', 'diarrhoea', 'dia_fever', 'dia_diarrhoea',
-    'dia_dysentery', 'dia_pain', 'dia_vomiting', 'respiratory_c', 'res_sore', 'res_cough',
-    'res_rhinorrhoe', 'res_breath', 'res_fever', 'fev_fever', 'fev_any_loc_sym', 'rash_mac',
-    'rash_papule', 'rash_mac_pop', 'rash_eschar', 'rash_pustule', 'rash_bullae', 'rash_fev',
-    'jaundice', 'jau_fever', 'jau_jaundice', 'jau_urine', 'jau_hep', 'jau_nausea', 'jau_vomiting',
-    'jau_abpain', 'encephalitis', 'enc_fever', 'enc_seizures', 'enc_rigidity', 'enc_sensorium',
-    'enc_ment_status', 'enc_somnelen', 'enc_irritab', 'hem_fever', 'hem_rigors', 'hem_headache',
-    'hem_chills', 'hem_malaise', 'hem_artharalgia', 'hem_myalgia', 'hem_hemanifestat',
-    'hem_retro_orbital', 'conjuctivities', 'con_fever', 'con_redness', 'con_discharge',
-    'con_scrusting', 'age_year', 'month'
-]
-
-symptom_display_names = {s: s.replace('_', ' ').title() for g in disease_groups.values() for s in g}
-
 
 # =============================
 # Defaults
@@ -87,7 +35,11 @@ def initialize_defaults():
         'age_year': round(default_age, 1),
         'month': "January",
         'durationofillness': 1,
-        "enable_dob": False
+        "enable_dob": False,
+        "adaptive": False,
+        "adaptive_answers": {},
+        "adaptive_skipped": [],
+        "show_grid": False,
     }
     for disease, symptoms in disease_groups.items():
         defaults[f"enable_{disease}"] = False
@@ -96,6 +48,42 @@ def initialize_defaults():
     return defaults
 
 
+@st.cache_resource
+def load_pipeline():
+    # Swaps in new model files in the background, no restart needed
+    handle = ReloadingPipeline("dengue", "best_small_E")
+    # Seed the prediction cache with the most frequent historical inputs
+    warm_cache(handle.pipeline)
+    # Walk the trees for explanations now, off the load path; the first
+    # explanation waits for it if it is still running
+    threading.Thread(target=get_explainer, args=(handle.pipeline.model,), name="explainer", daemon=True).start()
+    return handle.start()
+
+
+@st.cache_resource
+def load_lab_tests():
+    return LabTestCatalogue.load(load_pipeline().pipeline.model.class_names)
+
+
+@st.cache_resource
+def load_detector():
+    return OutbreakDetector(load_pipeline().pipeline.model.class_names)
+
+
+@st.cache_resource
+def load_cube():
+    return PredictionCube(load_pipeline().pipeline.model.class_names)
+
+
+@st.cache_resource
+def load_case_index():
+    # Built by tools/build_case_index.py; the section is hidden without it
+    try:
+        return CaseIndex.load(CASE_INDEX)
+    except FileNotFoundError:
+        return None
+
+
 # =============================
 # Main App
 # =============================
@@ -110,6 +98,29 @@ def main():
 
     st.sidebar.title("Navigation")
     page = st.sidebar.radio("Go to:", ["Home", "Prediction", "About"])
+    for alert in load_detector().active_alerts():
+        st.sidebar.warning(f"Outbreak signal: **{alert['virus']}** in {alert['state']} — "
+                           f"{alert['count']} cases today (baseline {alert['baseline_mean']:.1f}/day)")
+    with st.sidebar.expander("Diagnostics"):
+        st.caption("CPU thread budget for this worker")
+        st.json(threads.diagnostics())
+        handle = load_pipeline()
+        pipeline = handle.pipeline
+        st.caption("Model version")
+        st.json(handle.stats())
+        st.caption("Coalesced predictions")
+        st.json(pipeline.flights.stats())
+        if pipeline.cache is not None:
+            st.caption("Prediction cache")
+            st.json(pipeline.cache.stats())
+        if pipeline.shadow is not None:
+            st.caption("Shadow model")
+            st.json(pipeline.shadow.stats())
+        if pipeline.audit is not None:
+            st.caption("Audit log")
+            st.json(pipeline.audit.stats())
+        st.caption("Outbreak surveillance")
+        st.json(load_detector().stats())
 
     # =============================
     # HOME PAGE
@@ -142,6 +153,46 @@ def main():
         """)
         st.info("Developed by Amity Centre for Artificial Intelligence, Amity University, India.")
 
+        cube = load_cube()
+        if cube.stats()["predictions"]:
+            st.header("Predictions Dashboard")
+            col1, col2, col3 = st.columns(3)
+            by = col1.selectbox("Group by", ["state", "month", "gender", "age_band"], key="cube_by")
+            virus = col2.selectbox("Predicted virus", ["All"] + list(cube.class_names), key="cube_virus")
+            gender = col3.selectbox("Gender", ["All"] + GENDERS, key="cube_gender")
+            table = cube.frame(
+                [by],
+                virus=None if virus == "All" else virus,
+                gender=None if gender == "All" else gender,
+            )
+            if len(table):
+                st.bar_chart(table.set_index(by)["count"])
+                table["mean_confidence"] = (table["mean_confidence"] * 100).round(2)
+                table.columns = [by.replace("_", " ").title(), "Predictions", "Mean Confidence (%)"]
+                st.dataframe(table, use_container_width=True, hide_index=True)
+            else:
+                st.caption("No predictions match this selection yet.")
+
+        store = get_store(load_pipeline().pipeline.model)
+        if store is not None:
+            st.header("Current Global Drivers")
+            col1, col2, col3 = st.columns(3)
+            state = col1.selectbox("State", ["All"] + states, key="drivers_state")
+            month = col2.selectbox("Month", ["All"] + list(months), key="drivers_month")
+            virus = col3.selectbox("Predicted virus", ["All"] + store.classes(), key="drivers_virus")
+            drivers = store.drivers(
+                state=None if state == "All" else state,
+                month=None if month == "All" else months[month],
+                class_name=None if virus == "All" else virus,
+            )
+            if drivers.attrs["cases"]:
+                drivers["mean_abs_contribution"] = (drivers["mean_abs_contribution"] * 100).round(2)
+                drivers.columns = ["Feature", "Mean |Contribution| (%)"]
+                st.dataframe(drivers, use_container_width=True, hide_index=True)
+                st.caption(f"Averaged over {drivers.attrs['cases']} explained predictions with the current model.")
+            else:
+                st.caption("No explained predictions match this selection yet.")
+
     # =============================
     # PREDICTION PAGE
     # =============================
@@ -183,22 +234,61 @@ def main():
         # --- Symptoms ---
         st.header("Patient Symptoms")
         symptom_selected = False
-        for disease, symptoms in disease_groups.items():
-            st.subheader(disease)
-            enabled = st.checkbox(f"Enable {disease}", key=f"enable_{disease}")
-
-            cols = st.columns(3)
-            for i, symptom in enumerate(symptoms):
-                disp = symptom_display_names[symptom]
-                col = cols[i % 3]
-                if enabled:
-                    val = col.radio(disp, ["No", "Yes"], key=symptom, horizontal=True)
-                    user_input[symptom] = val
-                    if val == "Yes":
-                        symptom_selected = True
-                else:
-                    col.radio(disp, ["No", "Yes"], key=symptom, index=0, horizontal=True, disabled=True)
-                    user_input[symptom] = "No"
+        adaptive = st.checkbox("Adaptive questioning (ask the most informative symptom next)", key="adaptive")
+        if adaptive:
+            # Answered symptoms keep their value; the rest, skipped ones included, are entered as "No"
+            answers = st.session_state["adaptive_answers"]
+            skipped = st.session_state["adaptive_skipped"]
+            for symptom in symptom_display_names:
+                user_input[symptom] = answers.get(symptom, "No")
+            symptom_selected = "Yes" in answers.values()
+
+            ordered_input = {f: user_input.get(f, "No") for f in features}
+            with load_pipeline().acquire() as pipeline:
+                current_entropy, questions = next_questions(pipeline, ordered_input, answered=answers,
+                                                            skipped=skipped, top=1)
+            st.caption(f"Answered {len(answers)} of {len(symptom_display_names)} symptoms"
+                       f"{f' ({len(skipped)} skipped)' if skipped else ''}; "
+                       f"remaining uncertainty {current_entropy:.2f} bits.")
+            if questions:
+                symptom = questions[0][0]
+                st.subheader(f"Does the patient have: {symptom_display_names[symptom]}?")
+                col_yes, col_no, col_skip = st.columns(3)
+                for col, label, value in ((col_yes, "Yes", "Yes"), (col_no, "No", "No"), (col_skip, "Skip", None)):
+                    if col.button(label, key=f"answer_{label}"):
+                        # A skipped symptom is not asked again but is not a "No" answer
+                        if value is None:
+                            skipped.append(symptom)
+                        else:
+                            answers[symptom] = value
+                        st.rerun()
+            if answers or skipped:
+                st.write("Answers so far: " + ", ".join(
+                    [f"{symptom_display_names[s]}: {v}" for s, v in answers.items()]
+                    + [f"{symptom_display_names[s]}: skipped" for s in skipped]))
+                if st.button("Restart Questions"):
+                    st.session_state["adaptive_answers"] = {}
+                    st.session_state["adaptive_skipped"] = []
+                    st.rerun()
+        else:
+            for disease, symptoms in disease_groups.items():
+                st.subheader(disease)
+                enabled = st.checkbox(f"Enable {disease}", key=f"enable_{disease}")
+
+                cols = st.columns(3)
+                for i, symptom in enumerate(symptoms):
+                    disp = symptom_display_names[symptom]
+                    col = cols[i % 3]
+                    if enabled:
+                        val = col.radio(disp, ["No", "Yes"], key=symptom, horizontal=True)
+                        user_input[symptom] = val
+                        if val == "Yes":
+                            symptom_selected = True
+                    else:
+                        col.radio(disp, ["No", "Yes"], key=symptom, index=0, horizontal=True, disabled=True)
+                        user_input[symptom] = "No"
+
+        target_coverage = st.slider("Target coverage of recommended lab tests (%)", 50, 99, 80)
 
         # --- Predict Button ---
         if st.button("Predict"):
@@ -209,60 +299,158 @@ def main():
             else:
                 try:
                     ordered_input = {f: user_input.get(f, "No") for f in features}
-                    base_df = pd.DataFrame([ordered_input])
+                    # A model swap mid-request leaves this prediction on the version it started with
+                    with load_pipeline().acquire() as pipeline:
+                        binary_probs, probs = pipeline.predict_proba([ordered_input])
+                        ranking = pipeline.rank(binary_probs, probs)
+                        # Tests cover only the classes still in play after the dengue gate
+                        probs = np.where(pipeline.exclusion_mask(binary_probs, probs.shape[1]), 0.0, probs)
+                        gate, model = pipeline.gate, pipeline.model
+                    top_name = model.class_names[ranking[0]["class_index"][0]]
+                    load_detector().observe([ordered_input], [top_name])
+                    load_cube().add([ordered_input], [top_name], [ranking[0]["prob"][0]])
 
                     # --- Binary model ---
-                    binary_model = joblib.load("model_dengue.pkl")
-                    binary_encoders = joblib.load("label_encoders_dengue.pkl")
-                    for col in base_df.columns:
-                        if col in binary_encoders:
-                            le = binary_encoders[col]
-                            base_df[col] = base_df[col].apply(lambda x: le.transform([x])[0] if x in le.classes_ else -1)
-                    base_df = base_df.astype(np.int32)
-                    binary_pred = binary_model.predict(base_df)[0]
-                    probs = binary_model.predict_proba(base_df)[0]
-                    binary_label = "Dengue" if np.argmax(probs) == 0 else "Non-Dengue"
+                    binary_label = gate.class_name(np.argmax(binary_probs[0]))
                     st.info(f"Binary Model Prediction: **{binary_label}**")
 
                     # --- Multiclass model ---
-                    model = joblib.load("model_best_small_E.pkl")
-                    encoders = joblib.load("label_encoders_best_small_E.pkl")
-                    le_y = joblib.load("label_encoder_y_best_small_E.pkl")
-
-                    full_input_df = base_df.copy()
-                    for col in full_input_df.columns:
-                        if col in encoders:
-                            le = encoders[col]
-                            full_input_df[col] = full_input_df[col].apply(lambda x: le.transform([x])[0] if x in le.classes_ else -1)
-
-                    probs = model.predict_proba(full_input_df)[0]
-                    class_names = le_y.inverse_transform(range(len(probs)))
-                    predictions = sorted(zip(class_names, probs), key=lambda x: x[1], reverse=True)
-
-                    mean_conf = np.mean(probs)
-                    std_conf = np.std(probs)
-                    threshold_percent = min((mean_conf + std_conf) * 100, 95)
-
-                    if binary_label.lower() == "non-dengue":
-                        predictions = [(n, p) for n, p in predictions if n.lower() != "dengue"]
+                    class_names = model.class_names
+                    ranked = ranking[0]
+                    threshold_percent = ranked["threshold"] * 100
 
                     st.header("Predicted Viruses (Adaptive Confidence)")
-                    shown = False
-                    for i, (name, prob) in enumerate(predictions):
-                        if prob * 100 >= threshold_percent:
-                            st.success(f"{i + 1}. **{name}** — {prob * 100:.2f}% confidence")
-                            shown = True
-
-                    if not shown:
-                        name, prob = predictions[0]
+                    for i in np.flatnonzero(ranked["above_threshold"]):
+                        name, prob = class_names[ranked["class_index"][i]], ranked["prob"][i]
+                        st.success(f"{i + 1}. **{name}** — {prob * 100:.2f}% confidence")
+
+                    if not ranked["above_threshold"].any():
+                        name, prob = class_names[ranked["class_index"][0]], ranked["prob"][0]
                         st.info(f"Top prediction: **{name}** ({prob * 100:.2f}%)")
 
                     st.caption(f"(Adaptive threshold: {threshold_percent:.2f}%)")
+
+                    # --- Explanation of the top prediction ---
+                    top_index = ranked["class_index"][0]
+                    if get_explainer(model) is None:
+                        st.info(f"Explanations are not available for the {model.name} model "
+                                f"({type(model.model).__name__}); they need a scikit-learn tree model.")
+                    else:
+                        phi = contributions(model, [ordered_input], class_index=top_index)[0]
+                        explanation = top_contributions(ordered_input, phi)
+                        # Feeds the global drivers on the About page
+                        store = get_store(model)
+                        if store is not None:
+                            store.record([ordered_input], [class_names[top_index]], phi[None])
+                        st.header(f"Why {class_names[top_index]}?")
+                        explanation["contribution"] = (explanation["contribution"] * 100).round(2)
+                        explanation.columns = ["Feature", "Entered Value", "Contribution (%)"]
+                        st.dataframe(explanation, use_container_width=True, hide_index=True)
+                        st.caption("Exact TreeSHAP contributions to this virus's probability; "
+                                   "positive values pushed the prediction towards it.")
+
+                    # --- Laboratory tests ---
+                    catalogue = load_lab_tests()
+                    panel = catalogue.recommend(probs, target=target_coverage / 100)
+                    st.header("Recommended Laboratory Tests")
+                    for test in catalogue.panel(panel["tests"][0]):
+                        st.write(f"- **{test.name}** — ₹{test.cost:,.0f}, about {test.turnaround_hours:.0f} h")
+                    st.caption(f"Panel cost ₹{panel['cost'][0]:,.0f}; detects the true virus with "
+                               f"{panel['coverage'][0] * 100:.1f}% predicted probability; "
+                               f"results in about {panel['turnaround_hours'][0]:.0f} h.")
                     st.warning("⚠️ This AI-generated report is for research assistance, not clinical use.")
 
                 except Exception as e:
                     st.error(f"Error during prediction: {e}")
 
+        # --- What-if sensitivity ---
+        if st.button("What-if Sensitivity"):
+            if user_input['age_year'] <= 0:
+                st.error("⚠️ Please enter a valid age greater than 0.")
+            else:
+                try:
+                    ordered_input = {f: user_input.get(f, "No") for f in features}
+                    # Every single-symptom flip and age/duration/month sweep in one batch
+                    with load_pipeline().acquire() as pipeline:
+                        table = sensitivity(pipeline, ordered_input)
+
+                    st.header("What-if Symptom Sensitivity")
+                    st.caption(f"{len(table)} variations of this patient, largest probability shift first.")
+                    shown = table.head(20).copy()
+                    for col in ["shift", "top_probability", "dengue_gate", "dengue_gate_shift"]:
+                        shown[col] = (shown[col] * 100).round(2)
+                    shown.columns = ["Change", "Virus Most Affected", "Shift (%)", "Top Prediction",
+                                     "Top Confidence (%)", "Dengue Gate (%)", "Dengue Gate Shift (%)"]
+                    st.dataframe(shown, use_container_width=True, hide_index=True)
+
+                except Exception as e:
+                    st.error(f"Error during sensitivity analysis: {e}")
+
+        # --- Seasonal risk grid ---
+        if st.button("Seasonal Risk Grid"):
+            st.session_state["show_grid"] = True
+        if st.session_state["show_grid"]:
+            if user_input['age_year'] <= 0:
+                st.error("⚠️ Please enter a valid age greater than 0.")
+            else:
+                try:
+                    ordered_input = {f: user_input.get(f, "No") for f in features}
+                    # All 36 states x 12 months in one batch, kept per symptom profile
+                    with load_pipeline().acquire() as pipeline:
+                        grid = seasonal_grid(pipeline, ordered_input)
+
+                    st.header("Seasonal Risk by State and Month")
+                    options = ["Dengue (binary model)"] + list(grid.class_names)
+                    shown = st.selectbox("Show probability of", options, key="grid_class")
+                    values = grid.gate_dengue if shown == options[0] else grid.class_grid(shown)
+                    chart = alt.Chart(grid.to_frame(values * 100)).mark_rect().encode(
+                        x=alt.X("month:N", sort=grid.months, title="Month"),
+                        y=alt.Y("state:N", sort=grid.states, title="State"),
+                        color=alt.Color("value:Q", title="Probability (%)", scale=alt.Scale(scheme="orangered")),
+                        tooltip=["state", "month", alt.Tooltip("value:Q", title="Probability (%)", format=".2f")],
+                    )
+                    st.altair_chart(chart, use_container_width=True)
+                    st.caption("Same symptoms and age, as if reported from each state in each month.")
+                    if st.button("Hide Seasonal Risk Grid"):
+                        st.session_state["show_grid"] = False
+                        st.rerun()
+
+                except Exception as e:
+                    st.error(f"Error building the seasonal risk grid: {e}")
+
+        # --- Similar past cases ---
+        case_index = load_case_index()
+        if case_index is not None:
+            col1, col2 = st.columns(2)
+            same_state = col1.checkbox("Same state only", key="cases_same_state")
+            same_month = col2.checkbox("Same month only", key="cases_same_month")
+            if st.button("Similar Past Cases"):
+                if not symptom_selected:
+                    st.warning("⚠️ Please select at least one symptom before searching.")
+                else:
+                    try:
+                        ordered_input = {f: user_input.get(f, "No") for f in features}
+                        found = case_index.query(
+                            ordered_input, k=10,
+                            state=ordered_input["state_patient"] if same_state else None,
+                            month=ordered_input["month"] if same_month else None,
+                        )
+                        st.header("Similar Past Confirmed Cases")
+                        if len(found["case"]):
+                            month_names = {number: name for name, number in months.items()}
+                            st.dataframe({
+                                "Confirmed Virus": found["virus"],
+                                "State": found["state"],
+                                "Month": [month_names[m] for m in found["month"]],
+                                "Symptoms Differing": found["distance"],
+                            }, use_container_width=True, hide_index=True)
+                            st.caption(f"Nearest of {len(case_index):,} past cases by number of differing symptoms.")
+                        else:
+                            st.info("No past cases match this filter.")
+
+                    except Exception as e:
+                        st.error(f"Error searching past cases: {e}")
+
 
 # Run
 if __name__ == "__main__":
@@ -1,6 +1,7 @@
 import streamlit as st
 import pandas as pd
 import joblib
+from inference.xgboost_backend import XGBoostServing
 
 # List of states from your dataset
 states = [
@@ -56,6 +57,11 @@ features = [
     'con_scrusting', 'age_year', 'month'
 ]
 
+@st.cache_resource
+def load_xgb_model(filename):
+    """XGBoost model served through in-place prediction with a pinned thread count."""
+    return XGBoostServing(joblib.load(filename))
+
 def main():
     # Page 1: About the app
 
@@ -163,7 +169,7 @@ def main():
                     # Load label encoder
                     label_encoder = joblib.load('label_encoder_xgb.pkl')
                     # Load the trained model
-                    model = joblib.load('model_xgb.pkl')
+                    model = load_xgb_model('model_xgb.pkl')
                     encoded_class_labels = model.classes_  # These are numeric
 
                     # Convert encoded labels back to original class names
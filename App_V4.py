@@ -1,6 +1,7 @@
 import streamlit as st
 import pandas as pd
 import joblib
+from inference.xgboost_backend import XGBoostServing
 
 # List of states from your dataset
 states = [
@@ -71,6 +72,11 @@ def initialize_defaults():
             defaults[symptom] = "No"
     return defaults
 
+@st.cache_resource
+def load_xgb_model(filename):
+    """XGBoost model served through in-place prediction with a pinned thread count."""
+    return XGBoostServing(joblib.load(filename))
+
 def main():
     st.set_page_config(page_title="Virus Prediction App", layout="wide")
     
@@ -164,7 +170,7 @@ def main():
                 try:
                     # Load label encoder and trained model
                     label_encoder = joblib.load('label_encoder_xgb_N3.pkl')
-                    model = joblib.load('model_xgb_N3.pkl')
+                    model = load_xgb_model('model_xgb_N3.pkl')
                     encoded_class_labels = model.classes_  # These are numeric
 
                     # Convert encoded labels back to original class names
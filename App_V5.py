@@ -1,6 +1,7 @@
 import streamlit as st
 import pandas as pd
 import joblib
+from inference.xgboost_backend import XGBoostServing
 
 # List of states from your dataset
 states = [
@@ -71,6 +72,11 @@ def initialize_defaults():
             defaults[symptom] = "No"
     return defaults
 
+@st.cache_resource
+def load_xgb_model(filename):
+    """XGBoost model served through in-place prediction with a pinned thread count."""
+    return XGBoostServing(joblib.load(filename))
+
 def main():
     st.set_page_config(page_title="Virus Prediction App", layout="wide")
     
@@ -165,7 +171,7 @@ def main():
                     # Load the label encoders and trained XGBoost model
                     label_encoders = joblib.load('label_encoders_xgb_best_small_E.pkl')  # Feature encoders
                     label_encoder_y = joblib.load('label_encoder_y_xgb_best_small_E.pkl')  # Target encoder
-                    model = joblib.load('model_xgb_best_small_E.pkl')  # Trained XGBoost model
+                    model = load_xgb_model('model_xgb_best_small_E.pkl')  # Trained XGBoost model
 
                     # Encode categorical features using the saved label encoders
                     for col in input_df.columns:
@@ -4,6 +4,8 @@ import joblib
 import numpy as np
 import datetime
 
+from inference.profiles import get_profile
+
 # Data definitions
 states = [
     'Andaman And Nicobar Islands', 'Andhra Pradesh', 'Arunachal Pradesh', 'Assam',
@@ -148,6 +150,11 @@ def initialize_defaults():
 
     return defaults
 
+@st.cache_resource
+def load_bi_lstm_model():
+    """Bi-LSTM wrapped for single-row serving; traced and warmed up once per process."""
+    return get_profile("bi_lstm_E").model
+
 def main():
     st.set_page_config(page_title="Virus Prediction App", layout="wide")
         
@@ -319,7 +326,7 @@ def main():
                     full_input_df = base_input_df.copy()  # separate copy for full model
                     label_encoders = joblib.load('label_encoders_bi_lstm_E.pkl')
                     label_encoder_y = joblib.load('label_encoder_y_bi_lstm_E.pkl')
-                    model = joblib.load('model_bi_lstm_best_E.keras')
+                    model = load_bi_lstm_model()
 
                     # Encode input for the full model
                     for col in full_input_df.columns:
@@ -328,7 +335,7 @@ def main():
                             full_input_df[col] = le.transform(full_input_df[col])
                     full_input_df = full_input_df.astype(np.int32)
 
-                    probabilities = model.predict(full_input_df)[0]
+                    probabilities = model.predict_proba(full_input_df)[0]
                     class_indices = np.argsort(probabilities)[::-1]
                     class_names = label_encoder_y.inverse_transform(class_indices)
                     sorted_probabilities = probabilities[class_indices]
@@ -3,6 +3,7 @@ import pandas as pd
 import joblib
 import numpy as np
 import datetime
+from inference.xgboost_backend import XGBoostServing
 
 # Data definitions
 states = [
@@ -151,6 +152,11 @@ def initialize_defaults():
 
     return defaults
 
+@st.cache_resource
+def load_xgb_model(filename):
+    """XGBoost model served through in-place prediction with a pinned thread count."""
+    return XGBoostServing(joblib.load(filename))
+
 def main():
     st.set_page_config(page_title="Virus Prediction App", layout="wide")
         
@@ -321,7 +327,7 @@ def main():
                     binary_input_df = base_input_df.copy()
                     binary_label_encoders = joblib.load('label_encoders_xgb_dengue.pkl')
                     binary_label_encoder_y = joblib.load('label_encoder_y_xgb_dengue.pkl')
-                    binary_model = joblib.load('model_xgb_dengue.pkl')
+                    binary_model = load_xgb_model('model_xgb_dengue.pkl')
                     
                     for col in binary_input_df.columns:
                         if col in binary_label_encoders:
@@ -345,7 +351,7 @@ def main():
                     full_input_df = base_input_df.copy()
                     label_encoders = joblib.load('label_encoders_xgb_best_small_E.pkl')
                     label_encoder_y = joblib.load('label_encoder_y_xgb_best_small_E.pkl')
-                    model = joblib.load('model_xgb_best_small_E.pkl')
+                    model = load_xgb_model('model_xgb_best_small_E.pkl')
                                      
                     # Encode categorical features using the saved label encoders
                     for col in full_input_df.columns:
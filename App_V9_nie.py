@@ -3,6 +3,11 @@ import pandas as pd
 import joblib
 import numpy as np
 import datetime
+import hashlib
+import time
+
+from inference.audit import default_audit_log
+from inference.profiles import artifact_hash
 
 # Data definitions
 states = [
@@ -151,6 +156,18 @@ def initialize_defaults():
 
     return defaults
 
+@st.cache_resource
+def load_audit_log():
+    return default_audit_log()
+
+@st.cache_resource
+def audit_version():
+    """Artifact version of the two models, computed like inference.pipeline.Pipeline.version."""
+    gate = artifact_hash(['model_dengue.pkl', 'label_encoders_dengue.pkl', 'label_encoder_y_dengue.pkl'])
+    model = artifact_hash(['model_best_small_E.pkl', 'label_encoders_best_small_E.pkl',
+                           'label_encoder_y_best_small_E.pkl'])
+    return hashlib.sha256(f"{gate}:{model}".encode()).hexdigest()[:16]
+
 def main():
     st.set_page_config(page_title="Virus Prediction App", layout="wide")
         
@@ -313,7 +330,7 @@ def main():
                 # Create a base input dataframe.
                 ordered_input = {feature: user_input[feature] for feature in features}
                 base_input_df = pd.DataFrame([ordered_input])
-                print(base_input_df)
+                start = time.perf_counter()
                 
                 # --------------------
                 # Run the binary model.
@@ -360,6 +377,12 @@ def main():
                     # Get prediction probabilities from the model
                     probabilities = model.predict_proba(input_df_encoded)[0]  # [0] to get the first row as we're using a single sample
 
+                    # Audit trail of the encoded input and both models' outputs, written off the request thread
+                    audit = load_audit_log()
+                    if audit is not None:
+                        audit.record("dengue+best_small_E", audit_version(), input_df_encoded.to_numpy(),
+                                     [binary_probabilities], [probabilities], time.perf_counter() - start)
+
                     # Decode the class labels back to original names
                     class_names = label_encoder_y.inverse_transform(range(len(probabilities)))
 
@@ -0,0 +1,50 @@
+"""Query latency of the similar-case index at scale.
+
+Usage:
+    python -m benchmarks.bench_case_index                     # 10 million cases
+    python -m benchmarks.bench_case_index --n 1000000 --patterns 50000
+
+Cases repeat ``--patterns`` distinct synthetic symptom profiles, with random
+state, month and virus, which is how symptom combinations recur in practice.
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from inference.cases import CaseIndex, pack_symptoms
+from inference.sampling import synthetic_records
+from inference.schema import states
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=10_000_000)
+    parser.add_argument("--patterns", type=int, default=200_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    patterns = pack_symptoms(synthetic_records(args.patterns, seed=1))
+    start = time.perf_counter()
+    index = CaseIndex(patterns[rng.integers(0, len(patterns), args.n)], rng.integers(0, len(states), args.n),
+                      rng.integers(1, 13, args.n), rng.integers(0, 40, args.n), [f"virus {i}" for i in range(40)])
+    print(f"Indexed {len(index)} cases ({len(index.slices[(None, None)].patterns)} distinct patterns) "
+          f"in {time.perf_counter() - start:.1f}s")
+
+    queries = synthetic_records(args.queries, seed=2).to_dict("records")
+    for label, state, month in [("all cases", None, None), ("one state", "Kerala", None),
+                                ("one month", None, 7), ("state and month", "Kerala", 7)]:
+        times = []
+        for record in queries:
+            start = time.perf_counter()
+            index.query(record, k=args.k, state=state, month=month)
+            times.append(time.perf_counter() - start)
+        times = 1000 * np.array(times)
+        print(f"{label:>16}: p50 {np.percentile(times, 50):.2f} ms, p99 {np.percentile(times, 99):.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
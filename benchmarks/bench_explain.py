@@ -0,0 +1,128 @@
+"""Build time and per-row latency of the TreeSHAP explainer on a default-depth forest.
+
+Usage:
+    python -m benchmarks.bench_explain                     # 100 trees on 20k synthetic records
+    python -m benchmarks.bench_explain --trees 20 --n 5000
+    python -m benchmarks.bench_explain --max-build 30 --max-row 1.0  # exit non-zero when slower
+
+The forest is fitted with scikit-learn's defaults (fully grown trees) on
+synthetic records encoded for best_small_E, with labels drawn from that
+model's probabilities. Rows are explained for their top class, the way the
+Prediction page does, and uncached. Every row's contributions must sum with
+the expected value to ``predict_proba``, and a small tree is checked against
+brute-force Shapley values.
+"""
+
+import argparse
+import itertools
+import math
+import time
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.tree import DecisionTreeClassifier
+
+from inference.explain import TreeExplainer
+from inference.pipeline import get_pipeline
+from inference.sampling import synthetic_records
+
+
+def expectation(tree, x, known, node=0):
+    """Path-dependent expectation of a tree's class distribution with only ``known`` features of ``x`` set."""
+    t = tree.tree_
+    if t.children_left[node] == -1:
+        value = t.value[node, 0]
+        return value / value.sum()
+    left, right = t.children_left[node], t.children_right[node]
+    if t.feature[node] in known:
+        return expectation(tree, x, known, left if x[t.feature[node]] <= t.threshold[node] else right)
+    cover = t.weighted_n_node_samples
+    return (cover[left] * expectation(tree, x, known, left)
+            + cover[right] * expectation(tree, x, known, right)) / cover[node]
+
+
+def brute_force(tree, x):
+    """(n_features, n_classes) Shapley values of one tree by enumerating every subset of its features."""
+    used = sorted(set(tree.tree_.feature[tree.tree_.feature >= 0].tolist()))
+    n = len(used)
+    value = {known: expectation(tree, x, set(known))
+             for size in range(n + 1) for known in itertools.combinations(used, size)}
+    phi = np.zeros((len(x), tree.n_classes_))
+    for i in used:
+        others = [f for f in used if f != i]
+        for size in range(n):
+            weight = math.factorial(size) * math.factorial(n - size - 1) / math.factorial(n)
+            for known in itertools.combinations(others, size):
+                phi[i] += weight * (value[tuple(sorted(known + (i,)))] - value[known])
+    return phi
+
+
+def check_small(X, y):
+    """Exit non-zero unless a depth-4 tree matches brute-force Shapley values."""
+    tree = DecisionTreeClassifier(max_depth=4, random_state=0).fit(X, y)
+    explainer = TreeExplainer(tree)
+    rows = X[:10]
+    error = max(np.abs(explainer.shap_values(row)[0] - brute_force(tree, row)).max() for row in rows)
+    print(f"depth-4 tree: max difference from brute force {error:.2e} over {len(rows)} rows")
+    if error > 1e-9:
+        raise SystemExit("TreeSHAP differs from brute-force Shapley values")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=20000, help="training records")
+    parser.add_argument("--trees", type=int, default=100)
+    parser.add_argument("--rows", type=int, default=20, help="rows to explain")
+    parser.add_argument("--max-build", type=float, default=0.0, help="fail when building takes longer (seconds)")
+    parser.add_argument("--max-row", type=float, default=0.0, help="fail when a row takes longer on average (seconds)")
+    args = parser.parse_args()
+
+    pipeline = get_pipeline(cache=False, shadow=None, audit=False)
+    records = synthetic_records(args.n, seed=0)
+    X = pipeline.model.encode(records).astype(np.float32)
+    _, probs = pipeline.predict_proba(records, shadow=False, cache=False)
+    rng = np.random.default_rng(0)
+    y = (probs.cumsum(axis=1) < rng.random((len(probs), 1))).sum(axis=1).clip(max=probs.shape[1] - 1)
+    check_small(X, y)
+
+    start = time.perf_counter()
+    forest = RandomForestClassifier(args.trees, random_state=0).fit(X, y)
+    fit = time.perf_counter() - start
+    leaves = sum(tree.tree_.n_leaves for tree in forest.estimators_)
+    depth = max(tree.tree_.max_depth for tree in forest.estimators_)
+    print(f"forest: {args.trees} trees, {leaves} leaves, max depth {depth}, "
+          f"{forest.n_classes_} classes (fit {fit:.1f}s)")
+
+    start = time.perf_counter()
+    explainer = TreeExplainer(forest)
+    build = time.perf_counter() - start
+    print(f"build: {build:.2f}s")
+
+    rows = synthetic_records(args.rows, seed=1)
+    X_rows = pipeline.model.encode(rows).astype(np.float32)
+    expected = forest.predict_proba(X_rows)
+    top = expected.argmax(axis=1)
+    elapsed, error = [], 0.0
+    for row, c, p in zip(X_rows, top, expected):
+        start = time.perf_counter()
+        phi = explainer.shap_values(row, class_index=c)[0]
+        elapsed.append(time.perf_counter() - start)
+        error = max(error, abs(phi.sum() + explainer.expected_value[c] - p[c]))
+    print(f"top class: {np.mean(elapsed) * 1000:.0f}ms/row mean, {np.max(elapsed) * 1000:.0f}ms max "
+          f"over {len(elapsed)} rows; additivity error {error:.1e}")
+
+    start = time.perf_counter()
+    phi = explainer.shap_values(X_rows[:1])
+    print(f"all {forest.n_classes_} classes: {time.perf_counter() - start:.2f}s for one row; additivity error "
+          f"{np.abs(phi.sum(axis=1) + explainer.expected_value - expected[:1]).max():.1e}")
+
+    if error > 1e-9:
+        raise SystemExit("contributions do not add up to predict_proba")
+    if args.max_build and build > args.max_build:
+        raise SystemExit(f"building took {build:.1f}s, over {args.max_build}s")
+    if args.max_row and np.mean(elapsed) > args.max_row:
+        raise SystemExit(f"explaining took {np.mean(elapsed):.2f}s per row, over {args.max_row}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Latency of Keras ``predict`` vs. the traced fast path in KerasServing.
+
+Usage:
+    python -m benchmarks.bench_keras_fastpath            # model_bi_lstm_best_E.keras
+    python -m benchmarks.bench_keras_fastpath --synthetic  # stand-in Bi-LSTM, same input width
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from inference.keras_backend import KerasServing
+from inference.schema import features
+
+
+def synthetic_model(n_classes=40):
+    from tensorflow import keras
+
+    model = keras.Sequential([
+        keras.Input(shape=(len(features),)),
+        keras.layers.Reshape((len(features), 1)),
+        keras.layers.Bidirectional(keras.layers.LSTM(64)),
+        keras.layers.Dense(64, activation="relu"),
+        keras.layers.Dense(n_classes, activation="softmax"),
+    ])
+    return model
+
+
+def time_call(fn, X, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(X)
+        times.append(time.perf_counter() - start)
+    return np.median(times) * 1000, np.percentile(times, 95) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--synthetic", action="store_true", help="benchmark a stand-in model instead of the artifact")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 8, 64, 256, 1024])
+    args = parser.parse_args()
+
+    if args.synthetic:
+        serving = KerasServing(synthetic_model())
+    else:
+        from inference.profiles import get_profile
+        serving = get_profile("bi_lstm_E").model
+
+    rng = np.random.default_rng(0)
+    print(f"{'rows':>6} {'predict p50':>12} {'predict p95':>12} {'fast p50':>10} {'fast p95':>10} {'speedup':>8}")
+    for n in args.sizes:
+        X = rng.integers(0, 2, size=(n, len(features))).astype(np.float32)
+        np.testing.assert_allclose(serving.predict_fast(X), serving.predict_keras(X), rtol=1e-4, atol=1e-6)
+        keras_p50, keras_p95 = time_call(serving.predict_keras, X, args.repeat)
+        fast_p50, fast_p95 = time_call(serving.predict_fast, X, args.repeat)
+        print(f"{n:>6} {keras_p50:>10.2f}ms {keras_p95:>10.2f}ms {fast_p50:>8.2f}ms {fast_p95:>8.2f}ms "
+              f"{keras_p50 / fast_p50:>7.1f}x")
+    print(f"predict_proba switches to model.predict above {serving.batch_threshold} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Batch throughput of the lab test panel solver.
+
+Usage:
+    python -m benchmarks.bench_lab_tests                 # synthetic records through best_small_E
+    python -m benchmarks.bench_lab_tests --random 20000  # Dirichlet probability rows, no model
+    python -m benchmarks.bench_lab_tests --check 300     # compare with an uncapped brute-force search
+"""
+
+import argparse
+import itertools
+import time
+
+import numpy as np
+
+from inference.labtests import LabTestCatalogue
+
+AFI_CLASSES = ["Dengue", "Chikungunya", "Orientia tsutsugamushi (Scrub typhus)", "Leptospirosis"]
+
+
+def brute_force_cost(catalogue, p, target):
+    """Cheapest panel of any size over the tests that detect some of ``p``'s mass."""
+    goal = min(target, p[catalogue.coverable].sum()) - 1e-9
+    useful = np.flatnonzero((catalogue.cover & (p > 0)).any(axis=1))
+    best = np.inf
+    for size in range(len(useful) + 1):
+        for panel in itertools.combinations(useful, size):
+            cost = catalogue.cost[list(panel)].sum()
+            if cost < best and p[catalogue.cover[list(panel)].any(axis=0)].sum() >= goal:
+                best = cost
+    return best
+
+
+def check(catalogue, class_names, n, target=0.9):
+    """Exit non-zero unless ``recommend`` matches brute force on the AFI case and ``n`` sparse rows."""
+    rng = np.random.default_rng(0)
+    names = [str(c) for c in class_names]
+    probs = np.zeros((n + 1, len(names)))
+    probs[0, [names.index(c) for c in AFI_CLASSES if c in names]] = 1.0
+    for row in probs[1:]:
+        # Few classes per row keeps the brute force tractable
+        k = rng.integers(2, 8)
+        row[rng.choice(len(names), k, replace=False)] = rng.dirichlet(np.ones(k))
+    probs /= probs.sum(axis=1, keepdims=True)
+    result = catalogue.recommend(probs, target=target)
+    expected = np.array([brute_force_cost(catalogue, p, target) for p in probs])
+    wrong = np.flatnonzero(np.abs(result["cost"] - expected) > 1e-6)
+    print(f"AFI case: {[t.id for t in catalogue.panel(result['tests'][0])]} at {result['cost'][0]:.0f} "
+          f"(brute force {expected[0]:.0f})")
+    print(f"{len(probs) - len(wrong)}/{len(probs)} rows match the brute-force optimum")
+    if len(wrong):
+        raise SystemExit(f"rows {wrong[:10].tolist()} differ")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=5000)
+    parser.add_argument("--random", type=int, default=0, help="score N random probability rows instead")
+    parser.add_argument("--targets", type=float, nargs="+", default=[0.5, 0.8, 0.9, 0.95])
+    parser.add_argument("--check", type=int, default=0, help="check N sparse rows against brute force and exit")
+    args = parser.parse_args()
+
+    if args.random or args.check:
+        import joblib
+
+        from inference.profiles import PROFILE_ARTIFACTS, artifact_path
+
+        class_names = joblib.load(artifact_path(PROFILE_ARTIFACTS["best_small_E"]["label_encoder_y"])).classes_
+        probs = np.random.default_rng(0).dirichlet(np.full(len(class_names), 0.2), size=args.random)
+    else:
+        from inference.pipeline import get_pipeline
+        from inference.sampling import synthetic_records
+
+        pipeline = get_pipeline(cache=False)
+        class_names = pipeline.model.class_names
+        gate_probs, probs = pipeline.predict_proba(synthetic_records(args.n), shadow=False)
+        probs = np.where(pipeline.exclusion_mask(gate_probs, probs.shape[1]), 0.0, probs)
+
+    start = time.perf_counter()
+    catalogue = LabTestCatalogue.load(class_names)
+    print(f"catalogue: {len(catalogue.tests)} tests in {len(catalogue.groups)} groups, "
+          f"{sum(len(g.cost) for g in catalogue.groups)} panels ({(time.perf_counter() - start) * 1000:.0f}ms)")
+    if args.check:
+        return check(catalogue, class_names, args.check)
+    print(f"{'target':>7} {'rows':>7} {'time':>8} {'met':>6} {'mean cost':>10} {'mean tests':>11}")
+    for target in args.targets:
+        start = time.perf_counter()
+        result = catalogue.recommend(probs, target=target)
+        elapsed = time.perf_counter() - start
+        print(f"{target:>7.2f} {len(probs):>7} {elapsed:>7.2f}s {result['met'].mean():>6.1%} "
+              f"{result['cost'].mean():>10.0f} {result['tests'].sum(axis=1).mean():>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Latency and memory of the Keras Bi-LSTM vs. its TFLite export.
+
+Each backend runs in its own subprocess so peak RSS reflects only what that
+backend imports and loads.
+
+Usage:
+    python -m benchmarks.bench_tflite
+"""
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from inference.schema import features
+
+BACKENDS = {"keras": "bi_lstm_E", "tflite": "bi_lstm_E_tflite"}
+
+
+def run_child(backend, repeat, sizes):
+    start = time.perf_counter()
+    from inference.profiles import get_profile
+    model = get_profile(BACKENDS[backend]).model
+    load_s = time.perf_counter() - start
+
+    rng = np.random.default_rng(0)
+    result = {"backend": backend, "load_s": load_s, "latency_ms": {}}
+    for n in sizes:
+        X = rng.integers(0, 2, size=(n, len(features))).astype(np.float32)
+        model.predict_proba(X)
+        times = []
+        for _ in range(repeat):
+            t = time.perf_counter()
+            model.predict_proba(X)
+            times.append(time.perf_counter() - t)
+        result["latency_ms"][n] = float(np.median(times) * 1000)
+    result["tensorflow_imported"] = "tensorflow" in sys.modules
+    # ru_maxrss is in kilobytes on Linux
+    result["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps(result))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 16, 256])
+    parser.add_argument("--child", choices=list(BACKENDS), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.repeat, args.sizes)
+        return
+
+    results = []
+    for backend in BACKENDS:
+        cmd = [sys.executable, "-m", "benchmarks.bench_tflite", "--child", backend,
+               "--repeat", str(args.repeat), "--sizes", *map(str, args.sizes)]
+        out = subprocess.run(cmd, capture_output=True, text=True, check=True).stdout
+        results.append(json.loads(out.strip().splitlines()[-1]))
+
+    header = f"{'backend':>8} {'load':>8} {'peak RSS':>10} {'full TF':>8}" + "".join(f" {f'{n} rows':>10}" for n in args.sizes)
+    print(header)
+    for r in results:
+        row = f"{r['backend']:>8} {r['load_s']:>7.2f}s {r['peak_rss_mb']:>8.0f}MB {str(r['tensorflow_imported']):>8}"
+        row += "".join(f" {r['latency_ms'][str(n)]:>8.2f}ms" for n in args.sizes)
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Throughput of concurrent single-row XGBoost predictions, DataFrame vs. in-place.
+
+Usage:
+    python -m benchmarks.bench_xgb_concurrency                       # xgb_best_small_E
+    python -m benchmarks.bench_xgb_concurrency --profile xgb_dengue --sessions 1 4 16
+
+Each session is a thread scoring one record at a time in a loop, the way a
+Streamlit session does. "predict_proba" is ``XGBClassifier.predict_proba`` on
+a one-row DataFrame with the model's default thread count; "inplace" is
+``XGBoostServing`` on the same row as a contiguous array with ``nthread``
+pinned to the worker budget.
+"""
+
+import argparse
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from inference.profiles import get_profile
+from inference.sampling import synthetic_records
+from inference.schema import features
+from inference.xgboost_backend import XGBoostServing
+
+
+def run_sessions(fn, rows, sessions, duration):
+    """Run ``sessions`` threads calling ``fn`` for ``duration`` seconds; return (rows/s, p50 ms, p95 ms)."""
+    latencies = [[] for _ in range(sessions)]
+    stop = time.perf_counter() + duration
+
+    def session(i):
+        times = latencies[i]
+        j = i
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            fn(rows[j % len(rows)])
+            times.append(time.perf_counter() - start)
+            j += sessions
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(sessions)]
+    begin = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - begin
+    times = np.concatenate([np.asarray(t) for t in latencies])
+    return len(times) / elapsed, np.median(times) * 1000, np.percentile(times, 95) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profile", default="xgb_best_small_E")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per measurement")
+    parser.add_argument("--nthread", type=int, default=None, help="in-place thread count (default: worker budget)")
+    args = parser.parse_args()
+
+    profile = get_profile(args.profile)
+    serving = profile.model
+    if not isinstance(serving, XGBoostServing):
+        raise SystemExit(f"{args.profile} is not an XGBoost profile")
+    if args.nthread:
+        serving = XGBoostServing(serving.model, nthread=args.nthread)
+    native = serving.model
+    native.get_booster().set_param({"nthread": native.n_jobs or 0})
+
+    X = profile.encode(synthetic_records(1000)).astype(profile.dtype)
+    frames = [pd.DataFrame(X[i:i + 1], columns=features) for i in range(len(X))]
+    arrays = [X[i:i + 1] for i in range(len(X))]
+    np.testing.assert_allclose(serving.predict_proba(X), native.predict_proba(pd.DataFrame(X, columns=features)),
+                               rtol=1e-5, atol=1e-6)
+
+    print(f"{args.profile}: in-place nthread={serving.nthread}")
+    print(f"{'sessions':>8} {'predict_proba':>14} {'p95':>8} {'inplace':>12} {'p95':>8} {'speedup':>8}")
+    for sessions in args.sessions:
+        native.get_booster().set_param({"nthread": native.n_jobs or 0})
+        base_rps, _, base_p95 = run_sessions(native.predict_proba, frames, sessions, args.duration)
+        serving.booster.set_param({"nthread": serving.nthread})
+        fast_rps, _, fast_p95 = run_sessions(serving.predict_proba, arrays, sessions, args.duration)
+        print(f"{sessions:>8} {base_rps:>10.0f} r/s {base_p95:>6.2f}ms {fast_rps:>8.0f} r/s {fast_p95:>6.2f}ms "
+              f"{fast_rps / base_rps:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
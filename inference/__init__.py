@@ -0,0 +1,12 @@
+"""Serving layer shared by the Streamlit apps: model profiles, batch encoding and scoring."""
+
+from inference import threads
+
+# Before xgboost, sklearn or tensorflow are imported by the modules below
+threads.configure()
+
+from inference.encoding import BatchEncoder
+from inference.pipeline import Pipeline, get_pipeline
+from inference.profiles import ModelProfile, get_profile, load_profile
+
+__all__ = ["BatchEncoder", "ModelProfile", "Pipeline", "get_pipeline", "get_profile", "load_profile"]
@@ -0,0 +1,192 @@
+"""Append-only columnar audit log of served predictions.
+
+``AuditLog.record`` only copies the batch onto a bounded queue (dropping
+and counting it when the queue is full), so the request thread never waits
+on disk. A daemon thread buffers the rows and writes them as one
+compressed Arrow record batch when ``flush_rows`` rows are buffered or
+``flush_seconds`` have passed since the last write, one column per encoded
+feature plus timestamp, pipeline, model version, gate and class
+probabilities and latency.
+
+Files are Arrow IPC streams, ``audit-<UTC date>-<pid>-<part>.arrows``, so
+every flushed batch is durable even when a worker is killed (a Parquet
+file is unreadable until its footer is written on close). A new file is
+started each day and whenever the probability width changes after a model
+reload. ``python -m tools.compact_audit`` rewrites finished days into one
+Parquet file each.
+
+Written to ``audit/`` next to the artifacts (``SVP_AUDIT_DIR``; empty
+disables it). Needs pyarrow, which Streamlit already depends on.
+"""
+
+import datetime
+import logging
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+from inference.profiles import ARTIFACT_DIR
+from inference.schema import features
+
+logger = logging.getLogger(__name__)
+
+AUDIT_DIR = os.environ.get("SVP_AUDIT_DIR", os.path.join(ARTIFACT_DIR, "audit"))
+AUDIT_QUEUE_SIZE = int(os.environ.get("SVP_AUDIT_QUEUE_SIZE", 10000))
+FLUSH_ROWS = 1000
+FLUSH_SECONDS = 10.0
+
+
+def _utc_date(timestamp):
+    return datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc).date().isoformat()
+
+
+class AuditLog:
+    def __init__(self, directory=AUDIT_DIR, flush_rows=FLUSH_ROWS, flush_seconds=FLUSH_SECONDS,
+                 queue_size=AUDIT_QUEUE_SIZE):
+        import pyarrow  # noqa: F401  (fail at construction rather than in the writer thread)
+
+        self.directory = directory
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.dropped = 0
+        self.written = 0
+        self.errors = 0
+        self._reset()
+
+    def _reset(self):
+        # Per process: a forked worker writes its own files from its own thread
+        self._pid = os.getpid()
+        self._queue = queue.Queue(maxsize=self.queue_size)
+        self._thread = None
+        self._writer = None
+        self._sink = None
+        self._file_key = None
+        self._part = 0
+
+    def record(self, pipeline, version, X, gate_probs, probs, latency):
+        """Queue one scored batch (encoded rows, both probability matrices, seconds taken); never blocks."""
+        if self._pid != os.getpid() or self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._reset()
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name="audit-log", daemon=True)
+                    self._thread.start()
+        batch = (time.time(), pipeline, version, np.array(X, dtype=np.float32),
+                 np.array(gate_probs, dtype=np.float32), np.array(probs, dtype=np.float32), float(latency))
+        try:
+            self._queue.put_nowait(batch)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        with self._lock:
+            self.submitted += 1
+        return True
+
+    def _run(self):
+        pending, rows = [], 0
+        deadline = time.monotonic() + self.flush_seconds
+        while True:
+            try:
+                batch = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                pending.append(batch)
+                rows += len(batch[3])
+            except queue.Empty:
+                pass
+            if rows >= self.flush_rows or (pending and time.monotonic() >= deadline):
+                try:
+                    self._write(pending)
+                    with self._lock:
+                        self.written += rows
+                except Exception:
+                    with self._lock:
+                        self.errors += 1
+                    logger.exception("Writing %d audit rows to %s failed", rows, self.directory)
+                pending, rows = [], 0
+            if time.monotonic() >= deadline:
+                deadline = time.monotonic() + self.flush_seconds
+
+    def _table(self, pending):
+        import pyarrow as pa
+
+        counts = [len(b[3]) for b in pending]
+
+        def repeated(index, type):
+            return pa.array(np.repeat([b[index] for b in pending], counts), type)
+
+        def matrix(index):
+            values = np.concatenate([b[index] for b in pending])
+            return pa.FixedSizeListArray.from_arrays(pa.array(values.ravel()), values.shape[1])
+
+        X = np.concatenate([b[3] for b in pending])
+        return pa.table({
+            "timestamp": pa.array((np.repeat([b[0] for b in pending], counts) * 1000).astype(np.int64),
+                                  pa.timestamp("ms", tz="UTC")),
+            "pipeline": repeated(1, pa.string()),
+            "version": repeated(2, pa.string()),
+            **{name: pa.array(X[:, i]) for i, name in enumerate(features)},
+            "gate_probs": matrix(4),
+            "probs": matrix(5),
+            # Latency of the whole batch each row was scored in
+            "latency_ms": pa.array(np.repeat([b[6] * 1000 for b in pending], counts).astype(np.float32)),
+        })
+
+    def _write(self, pending):
+        # One file per day and schema (probability widths): a flush spanning midnight
+        # writes each row to the file of its own date, rows of another width go to the next part
+        groups = {}
+        for batch in pending:
+            groups.setdefault((_utc_date(batch[0]), batch[4].shape[1], batch[5].shape[1]), []).append(batch)
+        for (date, _, _), group in groups.items():
+            table = self._table(group)
+            writer = self._open(date, table.schema)
+            writer.write_table(table)
+            self._sink.flush()
+
+    def _open(self, date, schema):
+        import pyarrow as pa
+
+        key = (date, schema)
+        if self._writer is not None and self._file_key == key:
+            return self._writer
+        self.close()
+        os.makedirs(self.directory, exist_ok=True)
+        while True:
+            path = os.path.join(self.directory, f"audit-{date}-{self._pid}-{self._part}.arrows")
+            self._part += 1
+            if not os.path.exists(path):
+                break
+        self._sink = pa.OSFile(path, "wb")
+        self._writer = pa.ipc.new_stream(self._sink, schema, options=pa.ipc.IpcWriteOptions(compression="zstd"))
+        self._file_key = key
+        logger.info("Audit log writing to %s", path)
+        return self._writer
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._sink.close()
+            self._writer = self._sink = None
+
+    def stats(self):
+        with self._lock:
+            return {"directory": self.directory, "submitted": self.submitted, "dropped": self.dropped,
+                    "queued": self._queue.qsize(), "rows_written": self.written, "errors": self.errors}
+
+
+def default_audit_log():
+    """The audit log at ``SVP_AUDIT_DIR``, or None when disabled or pyarrow is missing."""
+    if not AUDIT_DIR:
+        return None
+    try:
+        return AuditLog(AUDIT_DIR)
+    except ImportError:
+        logger.warning("pyarrow is not installed; predictions are not audited")
+        return None
@@ -0,0 +1,202 @@
+"""Persistent prediction cache shared by every worker on a host.
+
+One SQLite file in WAL mode (concurrent readers, one writer at a time)
+maps ``(pipeline version, encoded feature row)`` to the gate and multiclass
+probabilities for that row. The version is derived from the artifact
+hashes of both profiles, so replacing a model file makes its old entries
+unreachable; ``purge_stale`` deletes them when the pipeline is opened.
+Entries past ``max_entries`` are evicted least recently used first, by a
+background thread woken every ``EVICT_EVERY`` inserts, so no request waits
+on the count or the delete. Hits only read the database: their recency is
+kept in memory and written in one transaction every ``TOUCH_EVERY`` hits
+or ``TOUCH_SECONDS``, and before each eviction, so concurrent readers never
+queue on the writer lock.
+
+Enabled by default at ``<artifact dir>/prediction_cache.sqlite``; set
+``SVP_CACHE_PATH`` to move it or to an empty string to disable it.
+"""
+
+import hashlib
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from inference.profiles import ARTIFACT_DIR
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = int(os.environ.get("SVP_CACHE_MAX_ENTRIES", 200000))
+# Evict after this many inserts rather than on every write
+EVICT_EVERY = 256
+# Write the recency of cache hits in one transaction per this many hits, or this often
+TOUCH_EVERY = 4096
+TOUCH_SECONDS = 30.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    key BLOB PRIMARY KEY,
+    pipeline TEXT NOT NULL,
+    version TEXT NOT NULL,
+    gate BLOB NOT NULL,
+    probs BLOB NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS predictions_last_used ON predictions (last_used);
+"""
+
+
+def row_keys(version, X_gate, X_model=None):
+    """One 16-byte key per row of the encoded matrices, scoped to ``version``."""
+    keys = []
+    for i in range(len(X_gate)):
+        h = hashlib.blake2b(version.encode(), digest_size=16)
+        h.update(np.ascontiguousarray(X_gate[i]).tobytes())
+        if X_model is not None:
+            h.update(np.ascontiguousarray(X_model[i]).tobytes())
+        keys.append(h.digest())
+    return keys
+
+
+class PredictionCache:
+    def __init__(self, path, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._inserts = 0
+        self._evictor = None
+        # key -> time of its last hit, not yet written
+        self._touched = {}
+        self._touched_at = time.time()
+        self.hits = 0
+        self.misses = 0
+        self._connect().executescript(_SCHEMA)
+
+    def _connect(self):
+        # sqlite3 connections belong to one thread, and must not cross a fork
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def purge_stale(self, pipeline, version):
+        """Drop entries written by other artifact versions of ``pipeline``."""
+        cur = self._connect().execute(
+            "DELETE FROM predictions WHERE pipeline = ? AND version != ?", (pipeline, version)
+        )
+        return cur.rowcount
+
+    def get_many(self, keys):
+        """Return ``{key: (gate row, probs row)}`` for the keys present, marking them used."""
+        conn = self._connect()
+        found = {}
+        # SQLite caps the number of bound parameters per statement
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            marks = ",".join("?" * len(chunk))
+            rows = conn.execute(f"SELECT key, gate, probs FROM predictions WHERE key IN ({marks})", chunk)
+            for key, gate, probs in rows:
+                found[key] = (np.frombuffer(gate, dtype=np.float64), np.frombuffer(probs, dtype=np.float64))
+        now = time.time()
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+            self._touched.update(dict.fromkeys(found, now))
+            flush = len(self._touched) >= TOUCH_EVERY or (
+                bool(self._touched) and now - self._touched_at >= TOUCH_SECONDS)
+        if flush:
+            self.flush_recency()
+        return found
+
+    def flush_recency(self):
+        """Write the pending hit times in one transaction; return how many were written."""
+        with self._lock:
+            touched, self._touched = self._touched, {}
+            self._touched_at = time.time()
+        if not touched:
+            return 0
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany("UPDATE predictions SET last_used = ? WHERE key = ?",
+                             [(used, key) for key, used in touched.items()])
+            conn.execute("COMMIT")
+        except sqlite3.OperationalError:
+            # Recency is best effort; never fail a read because a writer holds the lock
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            return 0
+        return len(touched)
+
+    def put_many(self, pipeline, version, keys, gate_probs, probs):
+        now = time.time()
+        gate_probs = np.asarray(gate_probs, dtype=np.float64)
+        probs = np.asarray(probs, dtype=np.float64)
+        rows = [(key, pipeline, version, gate_probs[i].tobytes(), probs[i].tobytes(), now)
+                for i, key in enumerate(keys)]
+        conn = self._connect()
+        conn.executemany("INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?, ?, ?)", rows)
+        with self._lock:
+            self._inserts += len(rows)
+            evict = self._inserts >= EVICT_EVERY
+            if evict:
+                self._inserts = 0
+        self._evictor = None
+        if evict:
+            self._evict_in_background()
+
+    def evict(self):
+        """Delete the least recently used entries beyond ``max_entries``."""
+        self.flush_recency()
+        conn = self._connect()
+        (count,) = conn.execute("SELECT COUNT(*) FROM predictions").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            conn.execute("DELETE FROM predictions WHERE key IN "
+                         "(SELECT key FROM predictions ORDER BY last_used LIMIT ?)", (excess,))
+        return max(excess, 0)
+
+    def _run_evictor(self, pending):
+        while True:
+            pending.get()
+            try:
+                self.evict()
+            except sqlite3.Error:
+                logger.exception("Evicting from the prediction cache at %s failed", self.path)
+
+    def _evict_in_background(self):
+        # Per process: a forked worker starts its own evictor
+        with self._lock:
+            if self._evictor is None or self._evictor[0] != os.getpid():
+                pending = queue.Queue(maxsize=1)
+                thread = threading.Thread(target=self._run_evictor, args=(pending,), name="cache-evict",
+                                          daemon=True)
+                thread.start()
+                self._evictor = (os.getpid(), pending)
+            pending = self._evictor[1]
+        try:
+            pending.put_nowait(True)
+        except queue.Full:
+            # An eviction is already due; it counts these inserts too
+            pass
+
+    def stats(self):
+        (entries,) = self._connect().execute("SELECT COUNT(*) FROM predictions").fetchone()
+        with self._lock:
+            return {"path": self.path, "entries": entries, "max_entries": self.max_entries,
+                    "hits": self.hits, "misses": self.misses}
+
+
+def default_cache():
+    """The cache at ``SVP_CACHE_PATH`` (default: next to the artifacts), or None when disabled."""
+    path = os.environ.get("SVP_CACHE_PATH", os.path.join(ARTIFACT_DIR, "prediction_cache.sqlite"))
+    return PredictionCache(path) if path else None
@@ -0,0 +1,136 @@
+"""Similar past cases by Hamming distance over packed symptom bits.
+
+``CaseIndex`` holds every historical case as one uint64 word with its 51
+symptoms as bits (``pack_symptoms``), plus state, month and confirmed
+virus codes. Cases with the same symptoms share a pattern: at load the
+cases are grouped by pattern once globally and once per state, per month
+and per (state, month), so a query XORs and popcounts only the distinct
+patterns of the slice it filters on rather than every case. The k nearest
+are the patterns below the distance at which the case counts reach k,
+plus the first cases at that distance.
+
+Built by ``tools/build_case_index.py`` into ``case_index.npz`` next to the
+artifacts (``SVP_CASE_INDEX`` overrides the path).
+"""
+
+import os
+
+import numpy as np
+
+from inference.profiles import artifact_path
+from inference.schema import states, symptoms
+
+CASE_INDEX = os.environ.get("SVP_CASE_INDEX", artifact_path("case_index.npz"))
+_bit_weights = np.left_shift(np.uint64(1), np.arange(len(symptoms), dtype=np.uint64))
+
+if hasattr(np, "bitwise_count"):
+    _popcount = np.bitwise_count
+else:
+    _byte_counts = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def _popcount(words):
+        return _byte_counts[words.view(np.uint8).reshape(-1, 8)].sum(axis=1, dtype=np.uint8)
+
+
+def pack_symptoms(records):
+    """One uint64 per record with bit i set when ``symptoms[i]`` is "Yes"."""
+    if hasattr(records, "columns"):
+        yes = records[symptoms].to_numpy() == "Yes"
+    else:
+        yes = np.array([[r.get(s, "No") == "Yes" for s in symptoms] for r in records], dtype=bool)
+        yes = yes.reshape(-1, len(symptoms))
+    return (yes.astype(np.uint64) * _bit_weights).sum(axis=1, dtype=np.uint64)
+
+
+def unpack_symptoms(bits):
+    """(N, 51) bool matrix of the symptoms set in each packed word."""
+    return (np.asarray(bits, dtype=np.uint64)[:, None] & _bit_weights) != 0
+
+
+class _Slice:
+    """The cases ``ids`` grouped by pattern: ``patterns[i]`` covers ``ids[starts[i]:starts[i + 1]]``."""
+
+    def __init__(self, bits, ids):
+        ids = ids[np.argsort(bits[ids], kind="stable")]
+        sorted_bits = bits[ids]
+        first = np.flatnonzero(np.r_[True, sorted_bits[1:] != sorted_bits[:-1]]) if len(ids) else np.array([], int)
+        self.ids = ids
+        self.patterns = sorted_bits[first]
+        self.starts = np.r_[first, len(ids)]
+        self.counts = np.diff(self.starts)
+
+    def nearest(self, query, k):
+        """``(case ids, distances)`` of the ``k`` cases closest to the packed ``query``."""
+        if not len(self.patterns):
+            return np.array([], dtype=self.ids.dtype), np.array([], dtype=np.uint8)
+        distance = _popcount(self.patterns ^ np.uint64(query))
+        per_distance = np.bincount(distance, weights=self.counts, minlength=len(symptoms) + 1)
+        # Smallest distance at which at least k cases have been reached
+        cutoff = min(int(np.searchsorted(np.cumsum(per_distance), k)), len(symptoms))
+        chosen = np.flatnonzero(distance <= cutoff)
+        chosen = chosen[np.argsort(distance[chosen], kind="stable")]
+
+        # Concatenate the case ranges of the chosen patterns, only as far as k
+        before = np.r_[0, np.cumsum(self.counts[chosen])[:-1]]
+        take = np.clip(k - before, 0, self.counts[chosen])
+        offsets = np.repeat(self.starts[chosen] - before, take)
+        ids = self.ids[np.arange(take.sum()) + offsets]
+        return ids, np.repeat(distance[chosen], take)
+
+
+class CaseIndex:
+    def __init__(self, bits, state, month, virus, virus_names):
+        self.bits = np.asarray(bits, dtype=np.uint64)
+        self.state = np.asarray(state, dtype=np.uint8)
+        self.month = np.asarray(month, dtype=np.uint8)
+        self.virus = np.asarray(virus, dtype=np.uint16)
+        self.virus_names = np.asarray(virus_names).astype(str)
+
+        ids = np.arange(len(self.bits), dtype=np.int64 if len(self.bits) > 2**31 - 1 else np.int32)
+        self.slices = {(None, None): _Slice(self.bits, ids)}
+        state, month = self.state.astype(np.int64), self.month.astype(np.int64)
+        for codes, slice_key in ((state, lambda v: (v, None)),
+                                 (month, lambda v: (None, v)),
+                                 (state * 16 + month, lambda v: (v // 16, v % 16))):
+            order = np.argsort(codes, kind="stable")
+            values, first = np.unique(codes[order], return_index=True)
+            for value, group in zip(values, np.split(ids[order], first[1:])):
+                self.slices[slice_key(int(value))] = _Slice(self.bits, group)
+
+    @classmethod
+    def from_records(cls, records, viruses):
+        """Index a DataFrame of raw records with the confirmed virus of each."""
+        virus_names, virus = np.unique(np.asarray(viruses).astype(str), return_inverse=True)
+        state = np.array([states.index(s) for s in records["state_patient"]], dtype=np.uint8)
+        return cls(pack_symptoms(records), state, records["month"].to_numpy(dtype=np.uint8), virus, virus_names)
+
+    @classmethod
+    def load(cls, path=CASE_INDEX):
+        data = np.load(path)
+        return cls(data["bits"], data["state"], data["month"], data["virus"], data["virus_names"])
+
+    def save(self, path=CASE_INDEX):
+        np.savez(path, bits=self.bits, state=self.state, month=self.month, virus=self.virus,
+                 virus_names=self.virus_names)
+
+    def __len__(self):
+        return len(self.bits)
+
+    def query(self, record, k=10, state=None, month=None):
+        """The ``k`` past cases nearest to ``record``'s symptoms, optionally from one state and/or month.
+
+        Returns a dict of arrays: ``case`` (row in the index), ``distance``
+        (symptoms that differ), ``state``, ``month`` and ``virus`` names.
+        """
+        key = (None if state is None else states.index(state), None if month is None else int(month))
+        query = pack_symptoms([record])[0]
+        # No slice means no past case from that state/month
+        found = self.slices.get(key, _Slice(self.bits, np.array([], dtype=np.int32)))
+        ids, distance = found.nearest(query, k)
+        return {
+            "case": ids,
+            "distance": distance,
+            "state": np.asarray(states)[self.state[ids]],
+            "month": self.month[ids],
+            "virus": self.virus_names[self.virus[ids]],
+        }
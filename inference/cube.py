@@ -0,0 +1,191 @@
+"""Pre-aggregated state x month x gender x age band x virus cube of predictions.
+
+``PredictionCube`` holds, per cell, the number of predictions whose top
+virus was that class and the sum of their top confidences, as two dense
+NumPy arrays (36 x 12 x 2 x 6 x n_classes, about 3 MB for 40 classes).
+``add`` updates the cells of a batch in place; ``rollup`` filters axes to
+one value and sums the rest away except the ones grouped by, so a
+dashboard view never touches the predictions themselves.
+
+Like the outbreak detector, the arrays live in shared memory so one cube
+created before the server forks aggregates every worker. It is written to
+``prediction_cube.npz`` next to the artifacts (``SVP_CUBE_PATH``; empty
+disables it) at most every ``snapshot_every`` seconds by a background
+thread, from a copy taken under the lock, and reloaded at start.
+"""
+
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from inference.profiles import artifact_path
+from inference.schema import months, states
+from inference.surveillance import shared_array
+
+logger = logging.getLogger(__name__)
+
+CUBE_PATH = os.environ.get("SVP_CUBE_PATH", artifact_path("prediction_cube.npz"))
+GENDERS = ["Male", "Female"]
+# Lower edges of the age bands, in years
+AGE_EDGES = [0, 5, 15, 30, 45, 60]
+AGE_BANDS = ["0-4", "5-14", "15-29", "30-44", "45-59", "60+"]
+AXES = ("state", "month", "gender", "age_band", "virus")
+
+_state_index = {s: i for i, s in enumerate(states)}
+_gender_index = {g: i for i, g in enumerate(GENDERS)}
+_month_names = list(months)
+
+
+def age_band(age):
+    """Index into ``AGE_BANDS`` for ages in years."""
+    return np.searchsorted(AGE_EDGES, np.asarray(age, dtype=np.float64), side="right") - 1
+
+
+class PredictionCube:
+    def __init__(self, class_names, path=CUBE_PATH, snapshot_every=60.0):
+        self.class_names = np.asarray(class_names).astype(str)
+        self._class_index = {name: i for i, name in enumerate(self.class_names)}
+        self.shape = (len(states), len(_month_names), len(GENDERS), len(AGE_BANDS), len(self.class_names))
+        self.counts = shared_array(self.shape, np.int64)
+        self.confidence = shared_array(self.shape, np.float64)
+        self.path = path
+        self.snapshot_every = snapshot_every
+        # time of the last snapshot, shared so only one worker writes per interval
+        self._snapshot_at = shared_array((1,), np.float64)
+        self._snapshot_at[0] = time.time()
+        self._lock = multiprocessing.Lock()
+        self._writer = None
+        if path and os.path.exists(path):
+            self._restore(path)
+
+    def _restore(self, path):
+        data = np.load(path)
+        saved = {name: i for i, name in enumerate(data["class_names"].astype(str))}
+        if data["counts"].shape[:-1] != self.shape[:-1]:
+            logger.warning("Ignoring %s: cube axes changed", path)
+            return
+        # Match classes by name, so a model with a new class list keeps the history it shares
+        for name, i in self._class_index.items():
+            if name in saved:
+                self.counts[..., i] = data["counts"][..., saved[name]]
+                self.confidence[..., i] = data["confidence"][..., saved[name]]
+
+    def add(self, records, viruses, confidences):
+        """Count predictions: raw records, their top virus names and top probabilities."""
+        cells, weights = [], []
+        for record, virus, confidence in zip(records, viruses, confidences):
+            index = (
+                _state_index.get(record.get("state_patient")),
+                int(record.get("month", 0)) - 1,
+                _gender_index.get(record.get("gender")),
+                int(age_band(record.get("age_year", -1))),
+                self._class_index.get(str(virus)),
+            )
+            if None not in index and 0 <= index[1] < len(_month_names) and index[3] >= 0:
+                cells.append(index)
+                weights.append(confidence)
+        if not cells:
+            return
+        flat = np.ravel_multi_index(tuple(np.array(cells).T), self.shape)
+        with self._lock:
+            np.add.at(self.counts.reshape(-1), flat, 1)
+            np.add.at(self.confidence.reshape(-1), flat, np.asarray(weights, dtype=np.float64))
+            due = self.path and time.time() - self._snapshot_at[0] >= self.snapshot_every
+            if due:
+                self._snapshot_at[0] = time.time()
+        if due:
+            self._snapshot_in_background()
+
+    def snapshot(self, path=None):
+        """Write the cube to ``path`` (default ``self.path``) atomically."""
+        with self._lock:
+            counts, confidence = self.counts.copy(), self.confidence.copy()
+        self._write(path or self.path, counts, confidence)
+
+    def _write(self, path, counts, confidence):
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez_compressed(f, counts=counts, confidence=confidence, class_names=self.class_names)
+        os.replace(tmp, path)
+
+    def _run_writer(self, pending):
+        while True:
+            pending.get()
+            try:
+                self.snapshot()
+            except Exception:
+                logger.exception("Writing the prediction cube to %s failed", self.path)
+
+    def _snapshot_in_background(self):
+        # Copying and compressing the cube takes milliseconds; keep both off the
+        # request thread. Per process: a forked worker starts its own writer
+        if self._writer is None or self._writer[0] != os.getpid():
+            pending = queue.Queue(maxsize=1)
+            thread = threading.Thread(target=self._run_writer, args=(pending,), name="cube-snapshot", daemon=True)
+            thread.start()
+            self._writer = (os.getpid(), pending)
+        try:
+            self._writer[1].put_nowait(True)
+        except queue.Full:
+            # Still writing the last one; the next interval writes a newer copy
+            pass
+
+    def _selection(self, filters):
+        index = []
+        lookups = {
+            "state": _state_index, "month": {m: i for i, m in enumerate(_month_names)},
+            "gender": _gender_index, "age_band": {b: i for i, b in enumerate(AGE_BANDS)},
+            "virus": self._class_index,
+        }
+        for axis in AXES:
+            value = filters.get(axis)
+            if value is None:
+                index.append(slice(None))
+            elif axis == "month" and isinstance(value, (int, np.integer)):
+                index.append(slice(value - 1, value))
+            else:
+                index.append(slice(lookups[axis][value], lookups[axis][value] + 1))
+        return tuple(index)
+
+    def rollup(self, by=(), **filters):
+        """``(counts, confidence sums)`` with one axis per name in ``by``, the rest summed.
+
+        ``filters`` restrict an axis to one value, e.g. ``virus="Dengue", month=7``
+        (months by number or name).
+        """
+        unknown = set(by) - set(AXES) | set(filters) - set(AXES)
+        if unknown:
+            raise ValueError(f"Unknown cube axes: {', '.join(sorted(unknown))}")
+        selection = self._selection(filters)
+        summed = tuple(i for i, axis in enumerate(AXES) if axis not in by)
+        order = [AXES.index(axis) for axis in by]
+        kept = sorted(order)
+        counts = self.counts[selection].sum(axis=summed)
+        confidence = self.confidence[selection].sum(axis=summed)
+        # Put the kept axes in the order asked for
+        permutation = [kept.index(i) for i in order]
+        return counts.transpose(permutation), confidence.transpose(permutation)
+
+    def frame(self, by, **filters):
+        """``rollup`` as a long DataFrame with ``count`` and ``mean_confidence``, empty cells dropped."""
+        counts, confidence = self.rollup(by, **filters)
+        labels = {"state": states, "month": _month_names, "gender": GENDERS, "age_band": AGE_BANDS,
+                  "virus": list(self.class_names)}
+        if len(by):
+            index = pd.MultiIndex.from_product([labels[axis] for axis in by], names=list(by))
+        else:
+            index = pd.RangeIndex(1)
+        table = pd.DataFrame({"count": counts.ravel(), "confidence": confidence.ravel()}, index=index)
+        table = table[table["count"] > 0]
+        table["mean_confidence"] = table.pop("confidence") / table["count"]
+        return table.reset_index()
+
+    def stats(self):
+        return {"predictions": int(self.counts.sum()), "cells_used": int(np.count_nonzero(self.counts)),
+                "path": self.path or None}
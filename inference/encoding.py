@@ -0,0 +1,65 @@
+"""Vectorized label encoding of raw patient records.
+
+The apps encode one DataFrame column at a time with
+``le.transform([x])[0] if x in le.classes_ else -1``. ``BatchEncoder`` does
+the same mapping for a whole batch with ``np.searchsorted`` over the sorted
+``classes_`` of each saved LabelEncoder, and only materializes the columns a
+model actually reads (see ``inference.introspection``). Columns outside that
+set are left at 0: the model never looks at them.
+"""
+
+import numpy as np
+import pandas as pd
+
+from inference.schema import features, numeric_features
+
+
+class BatchEncoder:
+    def __init__(self, encoders, columns=None, dtype=np.int32):
+        self.features = list(features)
+        self.dtype = dtype
+        if columns is None:
+            columns = range(len(self.features))
+        self.columns = np.array(sorted(set(int(i) for i in columns)), dtype=np.intp)
+
+        # (column index, sorted classes) for label-encoded columns, plain index for numeric ones
+        self._categorical = []
+        self._numeric = []
+        for idx in self.columns:
+            name = self.features[idx]
+            if name in encoders:
+                self._categorical.append((idx, np.asarray(encoders[name].classes_).astype(str)))
+            elif name in numeric_features:
+                self._numeric.append(idx)
+            else:
+                raise KeyError(f"No encoder for categorical feature '{name}'")
+
+    @property
+    def skipped(self):
+        """Names of the features this encoder never materializes."""
+        used = set(self.columns.tolist())
+        return [f for i, f in enumerate(self.features) if i not in used]
+
+    def _column(self, records, name, numeric=False):
+        if isinstance(records, pd.DataFrame):
+            return records[name].to_numpy()
+        if numeric:
+            # Symptoms left out of a record mean "No"; a numeric value has no such default
+            missing = [i for i, r in enumerate(records) if name not in r]
+            if missing:
+                raise KeyError(f"Record {missing[0]} is missing numeric feature '{name}'")
+        return np.array([r.get(name, "No") for r in records], dtype=object)
+
+    def encode(self, records):
+        """Encode a DataFrame or a list of raw input dicts into an (N, 56) matrix."""
+        n = len(records)
+        out = np.zeros((n, len(self.features)), dtype=self.dtype)
+        for idx, classes in self._categorical:
+            values = self._column(records, self.features[idx]).astype(str)
+            pos = np.searchsorted(classes, values)
+            pos_clipped = np.minimum(pos, len(classes) - 1)
+            found = classes[pos_clipped] == values
+            out[:, idx] = np.where(found, pos_clipped, -1)
+        for idx in self._numeric:
+            out[:, idx] = self._column(records, self.features[idx], numeric=True).astype(np.float64)
+        return out
@@ -0,0 +1,263 @@
+"""Exact TreeSHAP explanations for the scikit-learn tree models.
+
+``TreeExplainer`` walks every tree once at construction, one level of
+nodes at a time, and stores each root-to-leaf path as the features it
+splits on, with per feature the interval of values that follows the path
+(``lo < x <= hi``) and the share of training cover that went down it
+(``z``). Features repeated along a path are merged into one interval.
+Leaves are bucketed by the number ``D`` of distinct features on their
+path, so each bucket is a dense (leaves, D) array.
+
+For an encoded row, ``o`` marks which path conditions it satisfies. The
+Shapley weight of a subset of size ``k`` among ``D`` features is
+``k! (D-k-1)! / D! = integral of t^k (1-t)^(D-k-1) dt over [0, 1]``, so a
+path feature's contribution per unit of leaf value is
+``(o_i - z_i) * integral of prod_{j != i} (z_j + (o_j - z_j) t) dt``. That
+integrand is a polynomial of degree ``D - 1``, integrated exactly by
+Gauss-Legendre quadrature on ``ceil(D / 2)`` nodes, for all rows and all
+paths of a bucket at once. Contributions are in probability space, per
+class, and sum with ``expected_value`` to ``predict_proba``.
+
+Every leaf contributes to every row, so the work grows with the number of
+leaves times ``D ** 2``. Asked for one class (``class_index``), only the
+leaves holding some probability of that class are evaluated; the leaves
+of a fully grown forest are almost all pure, so that is a small fraction.
+
+``explain`` keeps the contributions of recent rows in an LRU keyed by the
+hash of the encoded feature vector. ``get_explainer`` is meant to be called
+when the model loads; for other model types (XGBoost, Keras) it logs a
+warning once and returns None.
+"""
+
+import collections
+import logging
+import threading
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+from sklearn.tree import DecisionTreeClassifier
+
+from inference.cache import row_keys
+from inference.schema import feature_display_names, features
+
+logger = logging.getLogger(__name__)
+
+EXPLAIN_CACHE_SIZE = 4096
+# Upper bound on rows x leaves x depth x quadrature nodes evaluated at once
+CHUNK_CELLS = 1 << 18
+
+
+def _floor32(a):
+    """Largest float32 not above each of ``a``: for float32 ``x``, ``x <= a`` exactly when ``x <= _floor32(a)``."""
+    f = a.astype(np.float32)
+    return np.where(f > a, np.nextafter(f, np.float32(-np.inf)), f)
+
+
+def _leaf_paths(tree, n_features):
+    """``(leaves, lo, hi, z, used)`` of a fitted sklearn tree, one (leaves, n_features) row per leaf."""
+    t = tree.tree_
+    left, right = t.children_left, t.children_right
+    parent = np.zeros(t.node_count, dtype=np.intp)
+    inner = np.flatnonzero(left != -1)
+    parent[left[inner]] = inner
+    parent[right[inner]] = inner
+    # Cover share of each node in its parent
+    share = t.weighted_n_node_samples / t.weighted_n_node_samples[parent]
+
+    leaves = np.flatnonzero(left == -1)
+    lo = np.full(len(leaves) * n_features, -np.inf)
+    hi = np.full(len(leaves) * n_features, np.inf)
+    z = np.ones(len(leaves) * n_features)
+    used = np.zeros(len(leaves) * n_features, dtype=bool)
+    # Walk every leaf up to the root together, one split per step
+    base, node = np.arange(len(leaves)) * n_features, leaves
+    while True:
+        keep = node != 0
+        base, node = base[keep], node[keep]
+        if not len(node):
+            break
+        up = parent[node]
+        slot = base + t.feature[up]
+        went_left = left[up] == node
+        below, above = slot[went_left], slot[~went_left]
+        hi[below] = np.minimum(hi[below], t.threshold[up[went_left]])
+        lo[above] = np.maximum(lo[above], t.threshold[up[~went_left]])
+        z[slot] *= share[node]
+        used[slot] = True
+        node = up
+    shape = (len(leaves), n_features)
+    return leaves, lo.reshape(shape), hi.reshape(shape), z.reshape(shape), used.reshape(shape)
+
+
+class _Bucket:
+    """Leaf paths with the same number ``depth`` of distinct features."""
+
+    def __init__(self, depth, feature, lo, hi, z, values):
+        self.depth = depth
+        self.feature = feature
+        # Rows are float32, so the bounds can be too without changing any comparison
+        self.lo = _floor32(lo)
+        self.hi = _floor32(hi)
+        self.z = z
+        self.values = values
+        # Leaves that give each class some probability
+        leaf, cls = np.nonzero(values)
+        order = np.argsort(cls, kind="stable")
+        self.by_class = np.split(leaf[order], np.cumsum(np.bincount(cls, minlength=values.shape[1]))[:-1])
+        nodes, weights = np.polynomial.legendre.leggauss((depth + 1) // 2)
+        self.nodes = ((nodes + 1) / 2)[:, None, None, None]
+        self.weights = (weights / 2)[:, None, None]
+
+    def contributions(self, X, leaves):
+        """(rows, leaves, depth) contribution of each path feature, per unit of leaf value."""
+        x = X[:, self.feature[leaves]]
+        z = self.z[leaves]
+        d = ((x > self.lo[leaves]) & (x <= self.hi[leaves])) - z
+        # (nodes, rows, leaves, depth) factors of every path, at every quadrature node
+        factors = self.nodes * d
+        factors += z
+        path = factors.prod(axis=-1)
+        path *= self.weights
+        # Leave each feature's own factor out
+        np.divide(path[..., None], factors, out=factors)
+        out = factors.sum(axis=0)
+        out *= d
+        return out
+
+
+class TreeExplainer:
+    def __init__(self, model, n_features=len(features)):
+        if isinstance(model, DecisionTreeClassifier):
+            trees = [model]
+        elif isinstance(model, (RandomForestClassifier, ExtraTreesClassifier)):
+            trees = model.estimators_
+        else:
+            raise TypeError(f"TreeSHAP needs a scikit-learn tree classifier, got {type(model).__name__}")
+        self.n_features = n_features
+
+        by_depth = collections.defaultdict(list)
+        self.expected_value = 0.0
+        for tree in trees:
+            value = tree.tree_.value[:, 0, :]
+            # predict_proba averages each tree's normalised leaf distribution
+            value = value / value.sum(axis=1, keepdims=True) / len(trees)
+            cover = tree.tree_.weighted_n_node_samples
+            leaves, lo, hi, z, used = _leaf_paths(tree, n_features)
+            self.expected_value = self.expected_value + cover[leaves] / cover[0] @ value[leaves]
+            # Leaves by path depth, then the features each path splits on, in column order
+            depth = used.sum(axis=1)
+            order = np.argsort(depth, kind="stable")
+            rows, feature = np.nonzero(used[order])
+            feature = feature.astype(np.int16)
+            flat = order[rows] * n_features + feature
+            lo, hi, z = lo.ravel()[flat], hi.ravel()[flat], z.ravel()[flat]
+            counts = np.bincount(depth, minlength=n_features + 1)
+            leaf_end, slot_end = np.cumsum(counts), np.cumsum(counts * np.arange(n_features + 1))
+            for d in np.flatnonzero(counts[1:]) + 1:
+                slots = slice(slot_end[d - 1], slot_end[d])
+                paths = [a[slots].reshape(-1, d) for a in (feature, lo, hi, z)]
+                by_depth[d].append(paths + [value[leaves[order[leaf_end[d - 1]:leaf_end[d]]]]])
+        self.buckets = [_Bucket(d, *(np.concatenate(part) for part in zip(*parts)))
+                        for d, parts in sorted(by_depth.items())]
+        self.n_paths = sum(len(b.feature) for b in self.buckets)
+
+        self._cache = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def shap_values(self, X, class_index=None):
+        """(N, n_features, n_classes) contributions for an encoded batch, or (N, n_features) for ``class_index``."""
+        # Trees compare float32 inputs against their thresholds
+        X = np.atleast_2d(np.asarray(X, dtype=np.float32))
+        n = len(X)
+        classes = slice(None) if class_index is None else [class_index]
+        phi = np.zeros((n, self.n_features, len(self.expected_value) if class_index is None else 1))
+        for bucket in self.buckets:
+            leaves = np.arange(len(bucket.feature)) if class_index is None else bucket.by_class[class_index]
+            step = max(1, CHUNK_CELLS // (n * bucket.depth * len(bucket.weights)))
+            for start in range(0, len(leaves), step):
+                chunk = leaves[start:start + step]
+                contrib = bucket.contributions(X, chunk)
+                # Scatter (row, leaf, slot) onto (row, feature, leaf), then weight by the leaves' class values
+                scatter = np.zeros((n, self.n_features, len(chunk)))
+                scatter[np.arange(n)[:, None, None], bucket.feature[chunk], np.arange(len(chunk))[:, None]] = contrib
+                phi += scatter @ bucket.values[chunk][:, classes]
+        return phi if class_index is None else phi[..., 0]
+
+    def explain(self, X, version="", class_index=None):
+        """Like ``shap_values`` but served from the LRU for rows seen before."""
+        X = np.atleast_2d(np.asarray(X, dtype=np.float32))
+        keys = [(key, class_index) for key in row_keys(version, X)]
+        shape = (self.n_features,) if class_index is not None else (self.n_features, len(self.expected_value))
+        out = np.empty((len(X),) + shape)
+        missing = []
+        with self._lock:
+            for i, key in enumerate(keys):
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    out[i] = self._cache[key]
+                else:
+                    missing.append(i)
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
+        if missing:
+            computed = self.shap_values(X[missing], class_index)
+            out[missing] = computed
+            with self._lock:
+                for i, phi in zip(missing, computed):
+                    self._cache[keys[i]] = phi
+                while len(self._cache) > EXPLAIN_CACHE_SIZE:
+                    self._cache.popitem(last=False)
+        return out
+
+    def stats(self):
+        with self._lock:
+            return {"paths": self.n_paths, "cached": len(self._cache), "hits": self.hits, "misses": self.misses}
+
+
+_explainers = {}
+_explainers_lock = threading.Lock()
+
+
+def get_explainer(profile):
+    """The ``TreeExplainer`` of a loaded profile, built on first use; None for unsupported models."""
+    key = (profile.name, profile.artifact_hash)
+    with _explainers_lock:
+        if key not in _explainers:
+            # A reloaded profile replaces the explainer of the version before it
+            for old in [k for k in _explainers if k[0] == profile.name]:
+                del _explainers[old]
+            try:
+                _explainers[key] = TreeExplainer(profile.model)
+            except TypeError as e:
+                logger.warning("No explanations for profile %s: %s", profile.name, e)
+                _explainers[key] = None
+        return _explainers[key]
+
+
+def contributions(profile, records, class_index=None):
+    """(N, n_features, n_classes) contributions for raw records, or (N, n_features) for ``class_index``.
+
+    Served through the explainer's LRU.
+    """
+    explainer = get_explainer(profile)
+    if explainer is None:
+        raise TypeError(f"Profile {profile.name} has no TreeSHAP explainer ({type(profile.model).__name__})")
+    return explainer.explain(profile.encode(records), profile.artifact_hash or "", class_index)
+
+
+def top_contributions(record, phi, top=10):
+    """The ``top`` entries of one record's (n_features,) contributions, largest magnitude first."""
+    order = np.argsort(-np.abs(phi), kind="stable")[:top]
+    return pd.DataFrame({
+        "feature": [feature_display_names[features[i]] for i in order],
+        "value": [record.get(features[i], "No") for i in order],
+        "contribution": phi[order],
+    })
+
+
+def explain_record(profile, record, class_index, top=10):
+    """Top contributions to ``class_index`` for one raw record."""
+    return top_contributions(record, contributions(profile, [record], class_index)[0], top)
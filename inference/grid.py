@@ -0,0 +1,83 @@
+"""State x month seasonal risk grid for one symptom profile.
+
+``grid_records`` builds all 36 x 12 = 432 state/month variants of a record
+(state-major) and ``seasonal_grid`` scores them in one batch through the
+pipeline. Grids are kept in a small in-process LRU keyed by the pipeline
+version and the record without its state and month, so the same symptom
+profile viewed from another state or month is served without scoring.
+"""
+
+import collections
+import hashlib
+import json
+import threading
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from inference.schema import features, months, states
+
+GRID_CACHE_SIZE = 256
+MONTH_NAMES = list(months)
+
+
+@dataclass(frozen=True)
+class SeasonalGrid:
+    states: list
+    months: list
+    class_names: np.ndarray
+    probs: np.ndarray          # (states, months, classes)
+    gate_dengue: np.ndarray    # (states, months) dengue probability from the gate
+
+    def class_grid(self, class_name):
+        """(states, months) probability of ``class_name``."""
+        return self.probs[:, :, int(np.flatnonzero(self.class_names == class_name)[0])]
+
+    def to_frame(self, values):
+        """Long DataFrame (state, month, value) of a (states, months) grid, for charts."""
+        return pd.DataFrame({
+            "state": np.repeat(self.states, len(self.months)),
+            "month": np.tile(self.months, len(self.states)),
+            "value": np.asarray(values).ravel(),
+        })
+
+
+def grid_records(record):
+    base = {f: record.get(f, "No") for f in features}
+    rows = [{**base, "state_patient": state, "month": months[month]} for state in states for month in MONTH_NAMES]
+    return pd.DataFrame(rows, columns=features)
+
+
+def profile_key(record):
+    """Hash of the record without the two grid axes."""
+    profile = {f: record.get(f, "No") for f in features if f not in ("state_patient", "month")}
+    return hashlib.sha256(json.dumps(profile, sort_keys=True, default=str).encode()).hexdigest()
+
+
+_grids = collections.OrderedDict()
+_grids_lock = threading.Lock()
+
+
+def seasonal_grid(pipeline, record):
+    key = (pipeline.version, profile_key(record))
+    with _grids_lock:
+        if key in _grids:
+            _grids.move_to_end(key)
+            return _grids[key]
+
+    gate_probs, probs = pipeline.predict_proba(grid_records(record), shadow=False, cache=False)
+    gate_dengue = 0 if pipeline.gate.dengue_index is None else pipeline.gate.dengue_index
+    shape = (len(states), len(MONTH_NAMES))
+    grid = SeasonalGrid(
+        states=list(states),
+        months=MONTH_NAMES,
+        class_names=pipeline.model.class_names,
+        probs=np.asarray(probs).reshape(shape + (-1,)),
+        gate_dengue=np.asarray(gate_probs)[:, gate_dengue].reshape(shape),
+    )
+    with _grids_lock:
+        _grids[key] = grid
+        while len(_grids) > GRID_CACHE_SIZE:
+            _grids.popitem(last=False)
+    return grid
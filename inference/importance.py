@@ -0,0 +1,229 @@
+"""Running global feature importance over the explained predictions.
+
+Every explained prediction adds the magnitude of its TreeSHAP vector (for
+the predicted virus) to one cell ``(state, month, predicted class)`` of an
+SQLite table: a case count and a per-feature sum of ``|contribution|``
+stored as a float32 blob. Cells only ever add, so the summary is updated
+in place, two stores merge by adding their cells (``merge_from``), and any
+slice by state, month or class is a sum over the matching rows. Mean
+absolute contribution per feature over a slice is its global driver score.
+
+``record`` only puts the cells on a bounded queue (dropping and counting
+them when it is full), like the audit log. A daemon thread adds them up in
+memory and writes them in one transaction every ``flush_cases`` cases or
+``flush_seconds``, so a slice shows new cases within that interval.
+
+Cells are scoped to the multiclass profile's artifact hash, like the
+prediction cache; entries of replaced model versions are purged on open.
+Stored next to the artifacts by default; set ``SVP_IMPORTANCE_PATH`` to
+move it or to an empty string to disable it.
+"""
+
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from inference.profiles import ARTIFACT_DIR
+from inference.schema import feature_display_names, features
+
+logger = logging.getLogger(__name__)
+
+IMPORTANCE_PATH = os.environ.get("SVP_IMPORTANCE_PATH", os.path.join(ARTIFACT_DIR, "feature_importance.sqlite"))
+IMPORTANCE_QUEUE_SIZE = int(os.environ.get("SVP_IMPORTANCE_QUEUE_SIZE", 10000))
+FLUSH_CASES = 1000
+FLUSH_SECONDS = 10.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS importance (
+    model TEXT NOT NULL,
+    version TEXT NOT NULL,
+    state TEXT NOT NULL,
+    month INTEGER NOT NULL,
+    class TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    abs_sum BLOB NOT NULL,
+    PRIMARY KEY (model, version, state, month, class)
+);
+"""
+
+
+class ImportanceStore:
+    def __init__(self, path, model, version, flush_cases=FLUSH_CASES, flush_seconds=FLUSH_SECONDS,
+                 queue_size=IMPORTANCE_QUEUE_SIZE):
+        self.path = path
+        self.model = model
+        self.version = version
+        self.flush_cases = flush_cases
+        self.flush_seconds = flush_seconds
+        self.queue_size = queue_size
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.dropped = 0
+        self.written = 0
+        self.errors = 0
+        self._reset()
+        self._connect().executescript(_SCHEMA)
+
+    def _reset(self):
+        # Per process: a forked worker writes its own cells from its own thread
+        self._pid = os.getpid()
+        self._queue = queue.Queue(maxsize=self.queue_size)
+        self._thread = None
+
+    def _connect(self):
+        # sqlite3 connections belong to one thread, and must not cross a fork
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def purge_stale(self):
+        """Drop cells written by other artifact versions of this model."""
+        cur = self._connect().execute(
+            "DELETE FROM importance WHERE model = ? AND version != ?", (self.model, self.version)
+        )
+        return cur.rowcount
+
+    def _add(self, cells):
+        """Add ``{(state, month, class): (count, abs_sum)}`` to the stored cells in one transaction."""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for (state, month, name), (count, abs_sum) in cells.items():
+                key = (self.model, self.version, state, month, name)
+                row = conn.execute("SELECT count, abs_sum FROM importance WHERE model = ? AND version = ? "
+                                   "AND state = ? AND month = ? AND class = ?", key).fetchone()
+                if row is not None:
+                    count += row[0]
+                    abs_sum = abs_sum + np.frombuffer(row[1], dtype=np.float32)
+                conn.execute("INSERT OR REPLACE INTO importance VALUES (?, ?, ?, ?, ?, ?, ?)",
+                             key + (int(count), np.asarray(abs_sum, dtype=np.float32).tobytes()))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def record(self, records, class_names, contributions):
+        """Queue explained predictions; never blocks.
+
+        ``records`` are raw input dicts, ``class_names`` the predicted class
+        of each and ``contributions`` their (N, n_features) TreeSHAP values.
+        """
+        cells = {}
+        for record, name, phi in zip(records, class_names, np.abs(np.asarray(contributions))):
+            key = (str(record["state_patient"]), int(record["month"]), str(name))
+            count, abs_sum = cells.get(key, (0, 0.0))
+            cells[key] = (count + 1, abs_sum + phi)
+        if not cells:
+            return False
+        if self._pid != os.getpid() or self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._reset()
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name="importance", daemon=True)
+                    self._thread.start()
+        try:
+            self._queue.put_nowait(cells)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        return True
+
+    def _run(self):
+        pending, cases = {}, 0
+        deadline = time.monotonic() + self.flush_seconds
+        while True:
+            try:
+                cells = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                for key, (count, abs_sum) in cells.items():
+                    total, total_sum = pending.get(key, (0, 0.0))
+                    pending[key] = (total + count, total_sum + abs_sum)
+                    cases += count
+            except queue.Empty:
+                pass
+            if cases >= self.flush_cases or (pending and time.monotonic() >= deadline):
+                try:
+                    self._add(pending)
+                    with self._lock:
+                        self.written += cases
+                except Exception:
+                    with self._lock:
+                        self.errors += 1
+                    logger.exception("Writing %d feature importance cases to %s failed", cases, self.path)
+                pending, cases = {}, 0
+            if time.monotonic() >= deadline:
+                deadline = time.monotonic() + self.flush_seconds
+
+    def merge_from(self, path):
+        """Add the cells of this model version from another importance file (e.g. another host)."""
+        other = sqlite3.connect(path)
+        try:
+            rows = other.execute("SELECT state, month, class, count, abs_sum FROM importance "
+                                 "WHERE model = ? AND version = ?", (self.model, self.version)).fetchall()
+        finally:
+            other.close()
+        self._add({(state, month, name): (count, np.frombuffer(blob, dtype=np.float32))
+                   for state, month, name, count, blob in rows})
+        return len(rows)
+
+    def summary(self, state=None, month=None, class_name=None):
+        """``(case count, per-feature sum of |contribution|)`` over the matching cells."""
+        query = "SELECT count, abs_sum FROM importance WHERE model = ? AND version = ?"
+        params = [self.model, self.version]
+        for column, value in (("state", state), ("month", month), ("class", class_name)):
+            if value is not None:
+                query += f" AND {column} = ?"
+                params.append(value)
+        count, abs_sum = 0, np.zeros(len(features))
+        for n, blob in self._connect().execute(query, params):
+            count += n
+            abs_sum += np.frombuffer(blob, dtype=np.float32)
+        return count, abs_sum
+
+    def drivers(self, state=None, month=None, class_name=None, top=10):
+        """Features by mean |contribution| over the matching cases; the case count is in ``attrs["cases"]``."""
+        count, abs_sum = self.summary(state, month, class_name)
+        mean = abs_sum / max(count, 1)
+        order = np.argsort(-mean, kind="stable")[:top]
+        table = pd.DataFrame({
+            "feature": [feature_display_names[features[i]] for i in order],
+            "mean_abs_contribution": mean[order],
+        })
+        table.attrs["cases"] = count
+        return table
+
+    def classes(self):
+        """Predicted classes with at least one recorded case."""
+        rows = self._connect().execute("SELECT DISTINCT class FROM importance WHERE model = ? AND version = ? "
+                                       "ORDER BY class", (self.model, self.version))
+        return [name for (name,) in rows]
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(profile, path=IMPORTANCE_PATH):
+    """The ``ImportanceStore`` for a loaded profile's version, or None when disabled."""
+    if not path:
+        return None
+    key = (profile.name, profile.artifact_hash)
+    with _stores_lock:
+        if key not in _stores:
+            for old in [k for k in _stores if k[0] == profile.name]:
+                del _stores[old]
+            store = ImportanceStore(path, profile.name, profile.artifact_hash or "")
+            store.purge_stale()
+            _stores[key] = store
+        return _stores[key]
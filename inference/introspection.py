@@ -0,0 +1,71 @@
+"""Which input columns does a loaded model actually split on?
+
+Run as ``python -m inference.introspection`` for a dead-feature report of
+every model profile whose artifacts are present.
+"""
+
+import numpy as np
+
+from inference.schema import features
+
+
+def _tree_features(tree):
+    # Leaves carry feature == -2 (TREE_UNDEFINED)
+    f = tree.tree_.feature
+    return f[f >= 0]
+
+
+def used_feature_indices(model, n_features=len(features)):
+    """Return the sorted feature indices referenced by any split (or weight) of ``model``.
+
+    Models whose structure cannot be inspected (e.g. Keras networks) are
+    assumed to use every column.
+    """
+    # XGBoost sklearn wrapper or raw Booster
+    booster = model.get_booster() if hasattr(model, "get_booster") else model
+    if hasattr(booster, "get_score") and hasattr(booster, "feature_names"):
+        names = booster.feature_names or [f"f{i}" for i in range(n_features)]
+        lookup = {name: i for i, name in enumerate(names)}
+        scores = booster.get_score(importance_type="weight")
+        return np.array(sorted(lookup[name] for name in scores), dtype=np.intp)
+
+    # sklearn single tree
+    if hasattr(model, "tree_"):
+        return np.unique(_tree_features(model))
+
+    # sklearn tree ensembles (RandomForest / ExtraTrees: list, GradientBoosting: 2D array)
+    if hasattr(model, "estimators_"):
+        trees = np.asarray(model.estimators_, dtype=object).ravel()
+        if all(hasattr(t, "tree_") for t in trees):
+            return np.unique(np.concatenate([_tree_features(t) for t in trees]))
+
+    # Linear models
+    if hasattr(model, "coef_"):
+        coef = np.atleast_2d(model.coef_)
+        return np.flatnonzero(np.any(coef != 0, axis=0))
+
+    return np.arange(n_features)
+
+
+def dead_features(used, n_features=len(features)):
+    """Names of the columns outside ``used``."""
+    mask = np.ones(n_features, dtype=bool)
+    mask[used] = False
+    return [features[i] for i in np.flatnonzero(mask)]
+
+
+def dead_feature_report(profiles):
+    """Return ``{profile name: [dead feature names]}`` for the given profiles."""
+    return {p.name: dead_features(p.used_features) for p in profiles}
+
+
+if __name__ == "__main__":
+    from inference.profiles import available_profiles, get_profile
+
+    profiles = [get_profile(name) for name in available_profiles()]
+    for name, dead in dead_feature_report(profiles).items():
+        print(f"{name}: {len(features) - len(dead)}/{len(features)} features used")
+        for f in dead:
+            print(f"    unused: {f}")
+    union = np.unique(np.concatenate([p.used_features for p in profiles])) if profiles else []
+    print(f"Union of used features: {len(union)}/{len(features)}")
@@ -0,0 +1,56 @@
+"""Low-overhead serving wrapper for the Keras Bi-LSTM classifier.
+
+``model.predict`` builds a data adapter and runs a tf.data loop on every
+call, which dominates latency for the one-row inputs the apps send. Small
+batches instead go through a ``tf.function`` traced once with a fixed
+``(None, *input_shape)`` float32 signature; ``predict`` is used only above
+``batch_threshold`` rows, where its batched loop keeps memory bounded.
+"""
+
+import numpy as np
+
+from inference import threads
+
+DEFAULT_BATCH_THRESHOLD = 1024
+
+
+def is_keras_model(model):
+    return type(model).__module__.split(".")[0] in ("keras", "tensorflow", "tf_keras")
+
+
+class KerasServing:
+    def __init__(self, model, batch_threshold=DEFAULT_BATCH_THRESHOLD, warmup=True):
+        import tensorflow as tf
+
+        threads.configure_tensorflow()
+        self.model = model
+        self.input_shape = tuple(model.input_shape[1:])
+        self.batch_threshold = batch_threshold
+        spec = tf.TensorSpec((None,) + self.input_shape, tf.float32)
+        self._call = tf.function(lambda x: model(x, training=False), input_signature=[spec])
+        if warmup:
+            self.warmup()
+
+    def warmup(self):
+        """Trace the fast path and run both paths once so the first request pays no setup cost."""
+        self._call(np.zeros((1,) + self.input_shape, dtype=np.float32))
+        # One row past the threshold, so predict compiles at the batch size it serves with
+        # and for a trailing partial batch
+        self.predict_keras(np.zeros((self.batch_threshold + 1,) + self.input_shape, dtype=np.float32))
+
+    def _reshape(self, X):
+        return np.asarray(X, dtype=np.float32).reshape((-1,) + self.input_shape)
+
+    def predict_fast(self, X):
+        return self._call(self._reshape(X)).numpy()
+
+    def predict_keras(self, X):
+        return self.model.predict(self._reshape(X), batch_size=self.batch_threshold, verbose=0)
+
+    def predict_proba(self, X):
+        if len(X) <= self.batch_threshold:
+            return self.predict_fast(X)
+        return self.predict_keras(X)
+
+    # Same entry point as the Keras model, so callers written against model.predict keep working
+    predict = predict_proba
@@ -0,0 +1,223 @@
+"""Laboratory test panels recommended from the multiclass probabilities.
+
+A catalogue (``lab_tests.json``, or ``SVP_LAB_TESTS``) lists each test with
+its cost, turnaround and the model classes it detects. For a patient with
+class probabilities ``p``, a panel's coverage is the probability that the
+true virus is detected by at least one of its tests, ``sum(p[covered])``.
+``recommend`` returns, per patient, the cheapest panel whose coverage
+reaches the target (capped at what the whole catalogue can cover, and the
+most coverage affordable when ``max_cost`` rules that out); ties go to the
+higher coverage.
+
+Tests that share no class never interact, so the catalogue splits into
+groups of tests connected through the classes they detect. Every panel of
+each group is enumerated once at load, dropping panels another panel of
+the group covers a superset of for no more. For a batch, one matrix
+product per group gives each panel's coverage per patient; a panel is only
+kept when it covers more than every cheaper one. Per patient the groups'
+(cost, coverage) frontiers are then combined one group at a time, keeping
+only combinations that cover more than every cheaper one and stopping at
+the first that reaches the target, and the largest group is joined last by
+a binary search. The result is exact for any panel size. Groups of more
+than ``max_group_tests`` tests only enumerate panels of up to three tests
+from that group.
+"""
+
+import itertools
+import json
+import logging
+import os
+from dataclasses import dataclass
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CATALOGUE_PATH = os.environ.get(
+    "SVP_LAB_TESTS", os.path.join(os.path.dirname(os.path.abspath(__file__)), "lab_tests.json")
+)
+# Patients per matrix product; bounds the (chunk, panels) working set
+CHUNK = 512
+# 2**16 panels per group at most
+MAX_GROUP_TESTS = 16
+
+
+@dataclass(frozen=True)
+class LabTest:
+    id: str
+    name: str
+    cost: float
+    turnaround_hours: float
+    covers: tuple
+
+
+@dataclass(frozen=True)
+class _Group:
+    """The non-dominated panels of one group of tests, cheapest first."""
+    tests: np.ndarray
+    classes: np.ndarray
+    member: np.ndarray
+    cover: np.ndarray
+    cost: np.ndarray
+
+
+def _connected(cover):
+    """Test indices grouped by shared classes (connected components of tests and classes)."""
+    parent = list(range(len(cover)))
+
+    def root(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for c in range(cover.shape[1]):
+        tests = np.flatnonzero(cover[:, c])
+        for t in tests[1:]:
+            parent[root(t)] = root(tests[0])
+    groups = {}
+    for t in range(len(cover)):
+        groups.setdefault(root(t), []).append(t)
+    return [np.array(g) for g in groups.values()]
+
+
+class LabTestCatalogue:
+    def __init__(self, tests, class_names, max_group_tests=MAX_GROUP_TESTS):
+        self.tests = list(tests)
+        class_names = [str(c) for c in class_names]
+        index = {name: i for i, name in enumerate(class_names)}
+        unknown = sorted({c for t in self.tests for c in t.covers if c not in index})
+        if unknown:
+            raise ValueError(f"Lab test catalogue names unknown classes: {', '.join(unknown)}")
+
+        self.cover = np.zeros((len(self.tests), len(class_names)), dtype=bool)
+        for i, test in enumerate(self.tests):
+            self.cover[i, [index[c] for c in test.covers]] = True
+        self.cost = np.array([t.cost for t in self.tests], dtype=np.float64)
+        self.turnaround = np.array([t.turnaround_hours for t in self.tests], dtype=np.float64)
+        self.coverable = self.cover.any(axis=0)
+
+        groups = [self._group(tests, max_group_tests) for tests in _connected(self.cover)]
+        # The largest group is joined last, where it costs a binary search rather than a product
+        self.groups = sorted(groups, key=lambda g: len(g.cost))
+
+    def _group(self, tests, max_group_tests):
+        n = len(tests)
+        if n > max_group_tests:
+            logger.warning("Lab tests %s form a group of %d; only panels of up to 3 of them are considered",
+                           ", ".join(self.tests[t].id for t in tests), n)
+            subsets = [p for size in range(4) for p in itertools.combinations(range(n), size)]
+            member = np.zeros((len(subsets), n), dtype=bool)
+            for i, p in enumerate(subsets):
+                member[i, list(p)] = True
+        else:
+            member = (np.arange(2 ** n)[:, None] >> np.arange(n)) & 1 == 1
+        classes = np.flatnonzero(self.cover[tests].any(axis=0))
+        cover = member.astype(np.float64) @ self.cover[np.ix_(tests, classes)].astype(np.float64) > 0
+        cost = member @ self.cost[tests]
+        turnaround = np.where(member, self.turnaround[tests], 0).max(axis=1)
+
+        # Cheapest (then fastest) first; keep a panel only when no earlier one covers all its classes
+        order = np.lexsort((turnaround, cost))
+        member, cover, cost = member[order], cover[order], cost[order]
+        bits = np.packbits(cover, axis=1)
+        kept = np.empty_like(bits)
+        keep = []
+        # The first of each distinct cover is the cheapest; only those can survive
+        _, first = np.unique(bits, axis=0, return_index=True)
+        for i in np.sort(first):
+            if not ((kept[:len(keep)] & bits[i]) == bits[i]).all(axis=1).any():
+                kept[len(keep)] = bits[i]
+                keep.append(i)
+        return _Group(tests, classes, member[keep], cover[keep].astype(np.float64), cost[keep])
+
+    @classmethod
+    def load(cls, class_names, path=CATALOGUE_PATH, **kwargs):
+        with open(path) as f:
+            spec = json.load(f)
+        tests = [LabTest(t["id"], t["name"], float(t["cost"]), float(t["turnaround_hours"]), tuple(t["covers"]))
+                 for t in spec["tests"]]
+        return cls(tests, class_names, **kwargs)
+
+    def _solve(self, masses, goal, max_cost):
+        """Per group, the index of its panel in the cheapest combination reaching ``goal``."""
+        # (cost, coverage) of the combinations so far, with how each was built
+        cost, mass = np.zeros(1), np.zeros(1)
+        trail = []
+        for group, m in zip(self.groups, masses):
+            # Panels of this group that cover more than every cheaper one
+            own = np.flatnonzero(m > np.r_[-1.0, np.maximum.accumulate(m)[:-1]])
+            if group is self.groups[-1]:
+                break
+            total_cost = (cost[:, None] + group.cost[own]).ravel()
+            total_mass = (mass[:, None] + m[own]).ravel()
+            order = np.lexsort((-total_mass, total_cost))
+            order = order[total_cost[order] <= max_cost]
+            sorted_mass = total_mass[order]
+            keep = order[sorted_mass > np.r_[-1.0, np.maximum.accumulate(sorted_mass)[:-1]]]
+            # Anything dearer than the first combination reaching the goal is never needed
+            reached = np.flatnonzero(total_mass[keep] >= goal)
+            if len(reached):
+                keep = keep[:reached[0] + 1]
+            previous, panel = np.divmod(keep, len(own))
+            trail.append((previous, own[panel]))
+            cost, mass = total_cost[keep], total_mass[keep]
+
+        # Join the last group: the cheapest of its panels covering what each combination still lacks
+        group = self.groups[-1]
+        own_cost, own_mass = group.cost[own], m[own]
+        j = np.searchsorted(own_mass, goal - mass)
+        feasible = j < len(own)
+        total = np.where(feasible, cost + own_cost[np.minimum(j, len(own) - 1)], np.inf)
+        if np.isfinite(total).any() and total.min() <= max_cost:
+            best = int(total.argmin())
+            last = int(j[best])
+        else:
+            # Target out of reach under max_cost: the most coverage it affords
+            j = np.searchsorted(own_cost, max_cost - cost, side="right") - 1
+            best = int((mass + own_mass[j]).argmax())
+            last = int(j[best])
+
+        choice = [0] * len(self.groups)
+        choice[-1] = int(own[last])
+        for g in range(len(trail) - 1, -1, -1):
+            previous, panel = trail[g]
+            choice[g] = int(panel[best])
+            best = int(previous[best])
+        return choice
+
+    def recommend(self, probs, target=0.9, max_cost=None):
+        """Cheapest panel per row of ``probs`` (N, n_classes) reaching ``target`` coverage.
+
+        Returns a dict of arrays: ``tests`` (N, n_tests) selection mask,
+        ``cost``, ``coverage``, ``turnaround_hours`` and ``met`` (whether the
+        capped target was reached).
+        """
+        probs = np.atleast_2d(np.asarray(probs, dtype=np.float64))
+        max_cost = np.inf if max_cost is None else max_cost
+        # No panel can exceed what the catalogue covers at all (e.g. "Not in the list")
+        goal = np.minimum(target, probs[:, self.coverable].sum(axis=1)) - 1e-9
+
+        n = len(probs)
+        tests = np.zeros((n, len(self.tests)), dtype=bool)
+        for start in range(0, n, CHUNK):
+            rows = np.arange(start, min(start + CHUNK, n))
+            masses = [probs[np.ix_(rows, g.classes)] @ g.cover.T for g in self.groups]
+            choices = np.array([self._solve([m[i] for m in masses], goal[row], max_cost)
+                                for i, row in enumerate(rows)]).reshape(len(rows), len(self.groups))
+            for g, group in enumerate(self.groups):
+                tests[np.ix_(rows, group.tests)] |= group.member[choices[:, g]]
+
+        covered = (tests.astype(np.float64) @ self.cover.astype(np.float64)) > 0
+        coverage = (probs * covered).sum(axis=1)
+        return {
+            "tests": tests,
+            "cost": tests @ self.cost,
+            "coverage": coverage,
+            "turnaround_hours": np.where(tests, self.turnaround, 0).max(axis=1),
+            "met": coverage >= goal,
+        }
+
+    def panel(self, selection):
+        """The ``LabTest`` objects of one row of ``recommend(...)["tests"]``."""
+        return [self.tests[i] for i in np.flatnonzero(selection)]
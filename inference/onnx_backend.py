@@ -0,0 +1,76 @@
+"""onnxruntime backend shared by every model profile.
+
+``tools/export_onnx.py`` writes one graph per profile that takes the raw
+record columns (strings for label-encoded features, floats for numeric
+ones), applies the profile's LabelEncoders as ``ai.onnx.ml.LabelEncoder``
+nodes, concatenates them into the ``features`` tensor and runs the model,
+ending in a single ``probabilities`` output. Whatever the original runtime
+(sklearn, XGBoost or Keras), serving goes through the same thread-controlled
+CPU session.
+
+Callers that already hold an encoded matrix (``ModelProfile.encode``) use
+``predict_proba``, which runs the model part of the same file, extracted at
+load time from ``features`` to ``probabilities``.
+"""
+
+import json
+
+import numpy as np
+
+from inference import threads
+from inference.schema import features
+
+FEATURES_TENSOR = "features"
+PROBABILITIES = "probabilities"
+
+
+def session_options(num_threads=None):
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    options.inter_op_num_threads = 1
+    options.intra_op_num_threads = num_threads or threads.budget().threads
+    return options
+
+
+class OnnxServing:
+    def __init__(self, path, num_threads=None):
+        import onnx
+        import onnxruntime as ort
+
+        self.path = path
+        graph = onnx.load(path)
+        options = session_options(num_threads)
+        providers = ["CPUExecutionProvider"]
+        self.session = ort.InferenceSession(graph.SerializeToString(), options, providers=providers)
+        model_part = onnx.utils.Extractor(graph).extract_model([FEATURES_TENSOR], [PROBABILITIES])
+        self.model_session = ort.InferenceSession(model_part.SerializeToString(), options, providers=providers)
+        self._string_inputs = {i.name for i in self.session.get_inputs() if i.type == "tensor(string)"}
+
+        props = {p.key: p.value for p in graph.metadata_props}
+        self.classes_ = np.array(json.loads(props["class_names"])) if "class_names" in props else None
+        self.used_features = np.array(json.loads(props["used_features"]), dtype=np.intp) if "used_features" in props else None
+
+    def _feed(self, records):
+        feed = {}
+        for name in features:
+            if hasattr(records, "columns"):
+                values = records[name].to_numpy()
+            else:
+                values = [r.get(name, "No") for r in records]
+            if name in self._string_inputs:
+                feed[name] = np.asarray(values).astype(str).astype(object).reshape(-1, 1)
+            else:
+                feed[name] = np.asarray(values, dtype=np.float32).reshape(-1, 1)
+        return feed
+
+    def predict_records(self, records):
+        """Score a DataFrame or list of raw input dicts end to end (encoding included)."""
+        return self.session.run([PROBABILITIES], self._feed(records))[0]
+
+    def predict_proba(self, X):
+        """Score an already-encoded (N, 56) matrix."""
+        X = np.asarray(X, dtype=np.float32)
+        return self.model_session.run([PROBABILITIES], {FEATURES_TENSOR: X})[0]
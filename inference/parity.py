@@ -0,0 +1,40 @@
+"""Agreement statistics between a reference model and a replacement.
+
+Shared by the export, distillation and parity tools.
+"""
+
+import numpy as np
+
+
+def accuracy_delta(reference, candidate, class_names, top_k=5):
+    """Compare two (N, n_classes) probability matrices; return a dict of summary stats."""
+    ref_top = reference.argmax(axis=1)
+    cand_top = candidate.argmax(axis=1)
+    # A 2-class gate has no top 5
+    k = min(top_k, reference.shape[1])
+    ref_k = np.argsort(-reference, axis=1)[:, :k]
+    cand_k = np.argsort(-candidate, axis=1)[:, :k]
+    overlap = np.array([len(np.intersect1d(a, b)) for a, b in zip(ref_k, cand_k)]) / k
+    delta = np.abs(reference - candidate)
+
+    flips = {}
+    for i in np.flatnonzero(ref_top != cand_top):
+        key = (class_names[ref_top[i]], class_names[cand_top[i]])
+        flips[key] = flips.get(key, 0) + 1
+    return {
+        "n": len(reference),
+        "top1_agreement": float(np.mean(ref_top == cand_top)),
+        f"top{k}_overlap": float(overlap.mean()),
+        "max_abs_delta": float(delta.max()),
+        "mean_abs_delta": float(delta.mean()),
+        "flips": sorted(flips.items(), key=lambda kv: -kv[1]),
+    }
+
+
+def print_report(report):
+    print(f"Cases compared:        {report['n']}")
+    for key, value in report.items():
+        if key not in ("n", "flips"):
+            print(f"{key + ':':<22} {value:.6f}")
+    for (ref, cand), count in report["flips"][:10]:
+        print(f"    {count:>5} x  {ref} -> {cand}")
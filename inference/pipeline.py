@@ -0,0 +1,158 @@
+"""Dengue gate + multiclass model, scored together over a batch of records."""
+
+import hashlib
+import time
+
+import numpy as np
+
+from inference.audit import default_audit_log
+from inference.cache import default_cache, row_keys
+from inference.coalesce import SingleFlight
+from inference.encoding import BatchEncoder
+from inference.postprocess import dengue_mask, rank_predictions
+from inference.profiles import get_profile
+from inference.schema import features
+from inference.shadow import SHADOW_MODEL, ShadowScorer
+
+
+def _same_encoders(a, b):
+    if a.keys() != b.keys():
+        return False
+    return all(np.array_equal(a[k].classes_, b[k].classes_) for k in a)
+
+
+class Pipeline:
+    def __init__(self, gate, model, cache=None):
+        self.gate = gate
+        self.model = model
+        self.name = f"{gate.name}+{model.name}"
+        self.version = hashlib.sha256(f"{gate.artifact_hash}:{model.artifact_hash}".encode()).hexdigest()[:16]
+        self.cache = cache
+        # Both profiles normally share one set of feature encoders, so each
+        # batch is encoded once over the union of the columns either model uses.
+        if _same_encoders(gate.encoders, model.encoders):
+            columns = np.union1d(gate.used_features, model.used_features)
+            self.encoder = BatchEncoder(model.encoders, columns=columns, dtype=np.float64)
+        else:
+            self.encoder = None
+        # Identical encoded batches scored concurrently share one model call
+        self.flights = SingleFlight()
+        self.shadow = None
+        self._shadow_reuses_encoding = False
+        self.audit = None
+        self._audit_rest = None
+
+    def encode(self, records):
+        """Return ``(X_gate, X_model)`` for a DataFrame or list of raw input dicts."""
+        if self.encoder is None:
+            return self.gate.encode(records), self.model.encode(records)
+        X = self.encoder.encode(records)
+        return X, X
+
+    def attach_shadow(self, shadow):
+        """Mirror every scored batch to ``shadow`` (a ``ShadowScorer``), off the request path."""
+        self.shadow = shadow
+        columns = self.encoder.columns if self.encoder is not None else self.model.used_features
+        self._shadow_reuses_encoding = (
+            _same_encoders(shadow.candidate.encoders, self.model.encoders)
+            and np.isin(shadow.candidate.used_features, columns).all()
+        )
+
+    def attach_audit(self, audit):
+        """Append every served batch to ``audit`` (an ``AuditLog``), off the request path."""
+        self.audit = audit
+        # The audit keeps every feature as entered, including those no model reads
+        served = self.encoder.columns if self.encoder is not None else self.model.used_features
+        rest = np.setdiff1d(np.arange(len(features)), served)
+        self._audit_rest = BatchEncoder(self.model.encoders, columns=rest, dtype=np.float64) if len(rest) else None
+
+    def predict_proba(self, records, shadow=True, cache=True):
+        """Return ``(gate probabilities (N, 2), multiclass probabilities (N, n_classes))``.
+
+        ``shadow=False`` keeps internal traffic (warmup, validation) away from
+        the shadow model and the audit log; ``cache=False`` scores without
+        reading or writing the prediction cache (hypothetical rows).
+        """
+        start = time.perf_counter()
+        X_gate, X_model = self.encode(records)
+        if cache:
+            gate_probs, probs = self._predict_encoded(X_gate, X_model)
+        else:
+            gate_probs, probs = self._coalesced(X_gate, X_model)
+        if shadow and self.shadow is not None:
+            self.shadow.submit(records, X_model if self._shadow_reuses_encoding else None, probs)
+        if shadow and self.audit is not None:
+            X_audit = X_model if self._audit_rest is None else X_model + self._audit_rest.encode(records)
+            self.audit.record(self.name, self.version, X_audit, gate_probs, probs, time.perf_counter() - start)
+        return gate_probs, probs
+
+    def _predict_encoded(self, X_gate, X_model):
+        if self.cache is None:
+            return self._coalesced(X_gate, X_model)
+
+        shared = X_gate is X_model
+        keys = row_keys(self.version, X_gate, None if shared else X_model)
+        hits = self.cache.get_many(keys)
+        miss = [i for i, key in enumerate(keys) if key not in hits]
+        if not hits:
+            gate_probs, probs = self._coalesced(X_gate, X_model)
+            self.cache.put_many(self.name, self.version, keys, gate_probs, probs)
+            return gate_probs, probs
+
+        first = next(iter(hits.values()))
+        gate_probs = np.empty((len(keys), len(first[0])))
+        probs = np.empty((len(keys), len(first[1])))
+        for i, key in enumerate(keys):
+            if key in hits:
+                gate_probs[i], probs[i] = hits[key]
+        if miss:
+            X_miss = X_gate[miss]
+            gate_miss, probs_miss = self._coalesced(X_miss, X_miss if shared else X_model[miss])
+            gate_probs[miss], probs[miss] = gate_miss, probs_miss
+            self.cache.put_many(self.name, self.version, [keys[i] for i in miss], gate_miss, probs_miss)
+        return gate_probs, probs
+
+    def _coalesced(self, X_gate, X_model):
+        key = X_gate.tobytes() if X_gate is X_model else X_gate.tobytes() + X_model.tobytes()
+        return self.flights.do(key, lambda: self._score(X_gate, X_model))
+
+    def _score(self, X_gate, X_model):
+        gate_probs = self.gate.predict_proba(X_gate)
+        probs = self.model.predict_proba(X_model)
+        # Coalesced callers all receive these same arrays
+        gate_probs.setflags(write=False)
+        probs.setflags(write=False)
+        return gate_probs, probs
+
+    def rank(self, gate_probs, probs, k=None):
+        """Rank multiclass probabilities, hiding dengue where the gate said Non-Dengue.
+
+        The ranking holds class indices only; map them with
+        ``self.model.class_names`` when rendering.
+        """
+        return rank_predictions(probs, k=k, exclude=self.exclusion_mask(gate_probs, probs.shape[1]))
+
+    def exclusion_mask(self, gate_probs, n_classes):
+        """(N, n_classes) mask of the classes the gate rules out (dengue where it said Non-Dengue)."""
+        gate_dengue = 0 if self.gate.dengue_index is None else self.gate.dengue_index
+        return dengue_mask(gate_probs, self.model.dengue_index, n_classes, gate_dengue)
+
+    def predict(self, records, k=None):
+        """Return ``(gate probabilities, ranking)`` for a batch of records."""
+        gate_probs, probs = self.predict_proba(records)
+        return gate_probs, self.rank(gate_probs, probs, k=k)
+
+    def purge_stale_cache(self):
+        """Drop cached predictions of other artifact versions of this gate/model pair."""
+        if self.cache is not None:
+            self.cache.purge_stale(self.name, self.version)
+
+
+def get_pipeline(gate="dengue", model="best_small_E", cache=True, shadow=SHADOW_MODEL, audit=True):
+    pipeline = Pipeline(get_profile(gate), get_profile(model), default_cache() if cache else None)
+    pipeline.purge_stale_cache()
+    if shadow:
+        pipeline.attach_shadow(ShadowScorer(get_profile(shadow), pipeline.model.class_names))
+    if audit:
+        pipeline.attach_audit(default_audit_log())
+    return pipeline
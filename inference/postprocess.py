@@ -0,0 +1,73 @@
+"""Batched ranking of multiclass probabilities.
+
+Replaces the per-row ``sorted(zip(class_names, probs))`` / list-comprehension
+filtering of the apps with array operations over the whole (N, n_classes)
+probability matrix:
+
+* adaptive threshold ``min(mean + std, 0.95)`` per row,
+* dengue exclusion for rows the binary gate called Non-Dengue,
+* top-k selection with ``argpartition``.
+"""
+
+import numpy as np
+
+MAX_THRESHOLD = 0.95
+
+
+def ranking_dtype(k):
+    return np.dtype([
+        ("class_index", np.int32, (k,)),    # -1 where the class was excluded
+        ("prob", np.float64, (k,)),
+        ("above_threshold", np.bool_, (k,)),
+        ("threshold", np.float64),
+        ("n_valid", np.int32),
+    ])
+
+
+def adaptive_threshold(probs, max_threshold=MAX_THRESHOLD):
+    return np.minimum(probs.mean(axis=1) + probs.std(axis=1), max_threshold)
+
+
+def dengue_mask(gate_probs, dengue_index, n_classes, gate_dengue_index=0):
+    """Boolean (N, n_classes) mask that hides the dengue class wherever the gate said Non-Dengue."""
+    gate_probs = np.asarray(gate_probs)
+    mask = np.zeros((len(gate_probs), n_classes), dtype=bool)
+    if dengue_index is not None:
+        # Gate class 0 is "Dengue" in label_encoder_y_dengue.pkl
+        mask[:, dengue_index] = gate_probs.argmax(axis=1) != gate_dengue_index
+    return mask
+
+
+def rank_predictions(probs, k=None, exclude=None, max_threshold=MAX_THRESHOLD):
+    """Rank each row of ``probs`` and return a structured array of shape (N,).
+
+    ``exclude`` is an optional boolean mask of the same shape; excluded
+    classes never appear in the ranking. The threshold is computed over the
+    unmasked probabilities, as the apps do.
+    """
+    probs = np.asarray(probs, dtype=np.float64)
+    n, n_classes = probs.shape
+    k = n_classes if k is None else min(k, n_classes)
+
+    threshold = adaptive_threshold(probs, max_threshold)
+    scores = probs
+    if exclude is not None:
+        scores = np.where(exclude, -np.inf, probs)
+
+    if k < n_classes:
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        top = np.broadcast_to(np.arange(n_classes), (n, n_classes))
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind="stable")
+    top = np.take_along_axis(top, order, axis=1)
+    top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+    valid = np.isfinite(top_scores)
+    out = np.zeros(n, dtype=ranking_dtype(k))
+    out["class_index"] = np.where(valid, top, -1)
+    out["prob"] = np.where(valid, top_scores, 0.0)
+    out["above_threshold"] = valid & (top_scores >= threshold[:, None])
+    out["threshold"] = threshold
+    out["n_valid"] = valid.sum(axis=1)
+    return out
@@ -0,0 +1,238 @@
+"""Model profiles: a saved model plus the encoders it was trained with.
+
+Each entry in ``PROFILE_ARTIFACTS`` mirrors the ``joblib.load`` triple used by
+one of the apps. Profiles are loaded once per process through
+``get_profile``; loading also records which feature columns the model splits
+on so the batch encoder can skip the rest.
+"""
+
+import hashlib
+import logging
+import os
+from dataclasses import dataclass
+
+import joblib
+import numpy as np
+
+from inference import threads
+from inference.encoding import BatchEncoder
+from inference.introspection import dead_features, used_feature_indices
+from inference.keras_backend import KerasServing, is_keras_model
+from inference.onnx_backend import OnnxServing
+from inference.schema import features
+from inference.tflite_backend import TFLiteServing
+from inference.xgboost_backend import XGBoostServing, is_xgboost_model
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_DIR = os.environ.get(
+    "SVP_ARTIFACT_DIR", os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+# "native" loads the pickled/Keras models, "onnx" the tools/export_onnx.py graphs
+BACKEND = os.environ.get("SVP_BACKEND", "native")
+
+# =============================
+# Artifact registry
+# =============================
+PROFILE_ARTIFACTS = {
+    # Binary dengue gate (App_V9_nie, App_V10_nie)
+    "dengue": {
+        "model": "model_dengue.pkl",
+        "encoders": "label_encoders_dengue.pkl",
+        "label_encoder_y": "label_encoder_y_dengue.pkl",
+        "dtype": np.int32,
+    },
+    # Binary dengue gate, XGBoost build (App_V7.1 - App_V9)
+    "xgb_dengue": {
+        "model": "model_xgb_dengue.pkl",
+        "encoders": "label_encoders_xgb_dengue.pkl",
+        "label_encoder_y": "label_encoder_y_xgb_dengue.pkl",
+        "dtype": np.int32,
+    },
+    # Multiclass model (App_V9_nie, App_V10_nie)
+    "best_small_E": {
+        "model": "model_best_small_E.pkl",
+        "encoders": "label_encoders_best_small_E.pkl",
+        "label_encoder_y": "label_encoder_y_best_small_E.pkl",
+        "dtype": np.float64,
+    },
+    # Multiclass XGBoost model (App_V5, App_V6, App_V9)
+    "xgb_best_small_E": {
+        "model": "model_xgb_best_small_E.pkl",
+        "encoders": "label_encoders_xgb_best_small_E.pkl",
+        "label_encoder_y": "label_encoder_y_xgb_best_small_E.pkl",
+        "dtype": np.float64,
+    },
+    # Multiclass Bi-LSTM (App_V6.2 - App_V8)
+    "bi_lstm_E": {
+        "model": "model_bi_lstm_best_E.keras",
+        "encoders": "label_encoders_bi_lstm_E.pkl",
+        "label_encoder_y": "label_encoder_y_bi_lstm_E.pkl",
+        "dtype": np.int32,
+    },
+    # Large random forest (App_V2). It predicts virus names directly, so there
+    # is no target encoder; features use the per-column encoders above.
+    "n": {
+        "model": "model_n.pkl",
+        "encoders": "label_encoders_best_small_E.pkl",
+        "label_encoder_y": None,
+        "dtype": np.float64,
+    },
+    # XGBoost student distilled from a slow teacher (tools/distill.py)
+    "student_E": {
+        "model": "model_student_E.pkl",
+        "encoders": "label_encoders_student_E.pkl",
+        "label_encoder_y": "label_encoder_y_student_E.pkl",
+        "dtype": np.float32,
+    },
+    # Quantized TFLite export of the Bi-LSTM (tools/export_tflite.py)
+    "bi_lstm_E_tflite": {
+        "model": "model_bi_lstm_best_E.tflite",
+        "encoders": "label_encoders_bi_lstm_E.pkl",
+        "label_encoder_y": "label_encoder_y_bi_lstm_E.pkl",
+        "dtype": np.int32,
+    },
+}
+
+
+def artifact_path(filename):
+    return os.path.join(ARTIFACT_DIR, filename)
+
+
+def onnx_artifact(name):
+    return artifact_path(os.path.splitext(PROFILE_ARTIFACTS[name]["model"])[0] + ".onnx")
+
+
+def artifact_hash(paths):
+    """Short content hash of the given artifact files, in order."""
+    h = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+    return h.hexdigest()[:16]
+
+
+def available_profiles():
+    """Names of the profiles whose artifacts are all present on disk."""
+    return [
+        name for name, spec in PROFILE_ARTIFACTS.items()
+        if all(os.path.exists(artifact_path(spec[k]))
+               for k in ("model", "encoders", "label_encoder_y") if spec[k] is not None)
+    ]
+
+
+# =============================
+# Profile
+# =============================
+@dataclass
+class ModelProfile:
+    name: str
+    model: object
+    encoders: dict
+    label_encoder_y: object
+    dtype: type
+    used_features: np.ndarray
+    encoder: BatchEncoder
+    # Frozen at load time so requests never call label_encoder_y.inverse_transform
+    class_names: np.ndarray
+    dengue_index: int = None
+    # Content hash of the files the profile was loaded from
+    artifact_hash: str = None
+
+    @property
+    def dead_features(self):
+        return dead_features(self.used_features)
+
+    def class_name(self, index):
+        return self.class_names[index]
+
+    def encode(self, records):
+        return self.encoder.encode(records)
+
+    def predict_records(self, records):
+        """Score raw records; the ONNX backend encodes inside its graph."""
+        if hasattr(self.model, "predict_records"):
+            return self.model.predict_records(records)
+        return self.predict_proba(self.encode(records))
+
+    def predict_proba(self, X):
+        return self.model.predict_proba(np.asarray(X).astype(self.dtype, copy=False))
+
+
+def load_model(filename):
+    path = artifact_path(filename)
+    if filename.endswith(".tflite"):
+        return TFLiteServing(path)
+    try:
+        return joblib.load(path)
+    except Exception:
+        if not filename.endswith(".keras"):
+            raise
+    # Native Keras archive rather than a joblib pickle
+    from tensorflow import keras
+    threads.configure_tensorflow()
+    return keras.models.load_model(path)
+
+
+def load_profile(name, backend=None):
+    spec = PROFILE_ARTIFACTS[name]
+    encoders = joblib.load(artifact_path(spec["encoders"]))
+    label_encoder_y = None
+    if spec["label_encoder_y"] is not None:
+        label_encoder_y = joblib.load(artifact_path(spec["label_encoder_y"]))
+
+    files = [artifact_path(spec[k]) for k in ("encoders", "label_encoder_y") if spec[k] is not None]
+    if (backend or BACKEND) == "onnx":
+        files.insert(0, onnx_artifact(name))
+        model = OnnxServing(onnx_artifact(name))
+        used = model.used_features if model.used_features is not None else np.arange(len(features))
+    else:
+        files.insert(0, artifact_path(spec["model"]))
+        model = load_model(spec["model"])
+        used = used_feature_indices(model)
+    if is_keras_model(model):
+        # Traced single-sample path, warmed up here rather than on the first request
+        model = KerasServing(model)
+    elif is_xgboost_model(model):
+        # In-place prediction, no DMatrix per call, nthread pinned to this worker's share
+        model = XGBoostServing(model)
+    classes = label_encoder_y.classes_ if label_encoder_y is not None else model.classes_
+    class_names = np.asarray(classes).astype(str)
+    class_names.setflags(write=False)
+    dengue = np.flatnonzero(np.char.lower(class_names) == "dengue")
+    profile = ModelProfile(
+        name=name,
+        model=model,
+        encoders=encoders,
+        label_encoder_y=label_encoder_y,
+        dtype=spec["dtype"],
+        used_features=used,
+        encoder=BatchEncoder(encoders, columns=used, dtype=spec["dtype"]),
+        class_names=class_names,
+        dengue_index=int(dengue[0]) if len(dengue) else None,
+        artifact_hash=artifact_hash(files),
+    )
+    logger.info("Loaded profile %s: %d features used, unused: %s",
+                name, len(used), ", ".join(profile.dead_features) or "none")
+    return profile
+
+
+_profiles = {}
+
+
+def get_profile(name):
+    """Load ``name`` on first use and return the same profile afterwards."""
+    if name not in _profiles:
+        _profiles[name] = load_profile(name)
+    return _profiles[name]
+
+
+def replace_profile(profile):
+    """Make ``get_profile`` return ``profile`` from now on (hot reload)."""
+    _profiles[profile.name] = profile
+
+
+def loaded_profiles():
+    """Names of the profiles already loaded in this process."""
+    return sorted(_profiles)
@@ -0,0 +1,77 @@
+"""Next-best-question ranking for adaptive symptom capture.
+
+Given the answers so far, every candidate symptom (neither answered nor
+skipped) is scored under both answers in one batch. The "Yes" branch is
+one row per candidate; the "No" branch is the record with that symptom
+"No", which is the same row for every candidate because unasked symptoms
+are entered as "No" (as the form does for disabled groups), so it is
+scored once. Before the question is asked the answer is unknown, so the
+current belief about a candidate is the mixture of its two branches
+weighted by how often the answer is "Yes", and a question's value is the
+expected drop in entropy of the multiclass distribution once answered,
+
+    gain = H(p_yes * P(yes) + (1 - p_yes) * P(no)) - [p_yes * H(yes) + (1 - p_yes) * H(no)],
+
+i.e. the mutual information between the answer and the prediction, with
+``p_yes`` the historical share of "Yes" answers for that symptom (from the
+warmup frequency table when present, else ``DEFAULT_YES_RATE``).
+"""
+
+import functools
+import os
+
+import numpy as np
+
+from inference.schema import features, symptoms
+from inference.warmup import WARMUP_TABLE, load_frequency_table
+
+DEFAULT_YES_RATE = 0.2
+_symptom_position = {s: i for i, s in enumerate(symptoms)}
+
+
+def entropy(probs):
+    probs = np.clip(np.asarray(probs, dtype=np.float64), 1e-12, 1.0)
+    return -(probs * np.log2(probs)).sum(axis=-1)
+
+
+@functools.lru_cache(maxsize=8)
+def _table_yes_rates(path, mtime, yes_code):
+    # ``mtime`` keys the cache, so a regenerated table is read again
+    table = load_frequency_table(path)
+    weights = table["count"].to_numpy(dtype=np.float64)
+    X = table[symptoms].to_numpy()
+    return (weights[:, None] * (X == yes_code)).sum(axis=0) / weights.sum()
+
+
+def symptom_yes_rates(encoders, path=WARMUP_TABLE):
+    """Historical P(answer is "Yes") per symptom, in ``symptoms`` order."""
+    if path and os.path.exists(path):
+        # Every symptom encoder is fit on {"No", "Yes"}
+        yes_code = int(np.searchsorted(encoders[symptoms[0]].classes_, "Yes"))
+        return _table_yes_rates(path, os.path.getmtime(path), yes_code)
+    return np.full(len(symptoms), DEFAULT_YES_RATE)
+
+
+def next_questions(pipeline, record, answered=(), skipped=(), top=None):
+    """Rank the symptoms neither answered nor skipped by expected entropy reduction.
+
+    Returns ``(entropy of the record as entered, [(symptom, gain, p_yes), ...])`` best first.
+    """
+    base = {f: record.get(f, "No") for f in features}
+    answered, skipped = set(answered), set(skipped)
+    candidates = [s for s in symptoms if s not in answered and s not in skipped]
+    entered = dict(base)
+    for s in candidates:
+        base[s] = "No"
+
+    rows = [entered, base] + [{**base, s: "Yes"} for s in candidates]
+    _, probs = pipeline.predict_proba(rows, shadow=False, cache=False)
+    probs_no, probs_yes = probs[1], probs[2:]
+
+    rates = symptom_yes_rates(pipeline.model.encoders)
+    p_yes = rates[[_symptom_position[s] for s in candidates]][:, None]
+    before = p_yes * probs_yes + (1 - p_yes) * probs_no
+    after = p_yes[:, 0] * entropy(probs_yes) + (1 - p_yes[:, 0]) * entropy(probs_no)
+    gain = entropy(before) - after
+    order = np.argsort(-gain, kind="stable")[:top]
+    return float(entropy(probs[0])), [(candidates[i], float(gain[i]), float(p_yes[i, 0])) for i in order]
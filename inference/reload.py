@@ -0,0 +1,194 @@
+"""Hot reload of the gate + multiclass pipeline when its artifacts change.
+
+``ReloadingPipeline`` holds the active ``Pipeline`` and a daemon thread that
+polls the artifact files every ``SVP_RELOAD_INTERVAL`` seconds. When a file
+changes, the new profiles are loaded in the background and checked on a
+synthetic parity sample against the active version: probabilities must be
+finite, rows must sum to 1, the class lists must match and top-1 agreement
+must reach ``SVP_RELOAD_MIN_AGREEMENT``. The new version then warms the
+prediction cache and replaces the active one under a lock.
+
+Callers score inside ``with handle.acquire() as pipeline:``. Each version
+counts the callers holding it, so predictions already running finish on the
+version they started with. A replaced version is dropped (and its models
+freed) once that count reaches zero.
+"""
+
+import logging
+import os
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+from inference.parity import accuracy_delta
+from inference.pipeline import Pipeline, get_pipeline
+from inference.profiles import BACKEND, PROFILE_ARTIFACTS, artifact_path, load_profile, onnx_artifact, replace_profile
+from inference.sampling import synthetic_records
+from inference.warmup import warm_cache
+
+logger = logging.getLogger(__name__)
+
+RELOAD_INTERVAL = float(os.environ.get("SVP_RELOAD_INTERVAL", 30))
+RELOAD_MIN_AGREEMENT = float(os.environ.get("SVP_RELOAD_MIN_AGREEMENT", 0.9))
+PARITY_SAMPLE = 2000
+
+
+def profile_files(name):
+    spec = PROFILE_ARTIFACTS[name]
+    model = onnx_artifact(name) if BACKEND == "onnx" else artifact_path(spec["model"])
+    return [model] + [artifact_path(spec[k]) for k in ("encoders", "label_encoder_y") if spec[k] is not None]
+
+
+class _Version:
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+        self.refs = 0
+
+
+class ReloadingPipeline:
+    def __init__(self, gate="dengue", model="best_small_E", interval=RELOAD_INTERVAL,
+                 min_agreement=RELOAD_MIN_AGREEMENT):
+        self.names = (gate, model)
+        self.interval = interval
+        self.min_agreement = min_agreement
+        self._lock = threading.Lock()
+        self._active = _Version(get_pipeline(gate, model))
+        self._retired = []
+        self._stamps = self._stat()
+        self._stop = threading.Event()
+        self._thread = None
+        self.reloads = 0
+        self.rejected = 0
+
+    @property
+    def pipeline(self):
+        """The active pipeline, for diagnostics; score through ``acquire``."""
+        return self._active.pipeline
+
+    @contextmanager
+    def acquire(self):
+        with self._lock:
+            version = self._active
+            version.refs += 1
+        try:
+            yield version.pipeline
+        finally:
+            with self._lock:
+                version.refs -= 1
+                self._retired = [v for v in self._retired if v.refs > 0]
+
+    def _stat(self):
+        stamps = {}
+        for name in self.names:
+            for path in profile_files(name):
+                try:
+                    st = os.stat(path)
+                    stamps[path] = (st.st_mtime_ns, st.st_size)
+                except OSError:
+                    stamps[path] = None
+        return stamps
+
+    def validate(self, candidate):
+        """Return ``(ok, report)`` comparing ``candidate`` with the active pipeline on a parity sample."""
+        active = self.pipeline
+        records = synthetic_records(PARITY_SAMPLE, seed=1)
+        # Score the reference without the cache too, so the synthetic rows never enter it
+        reference = Pipeline(active.gate, active.model)
+        gate_old, probs_old = reference.predict_proba(records, shadow=False)
+        gate_new, probs_new = candidate.predict_proba(records, shadow=False)
+
+        problems = []
+        if not np.array_equal(candidate.model.class_names, active.model.class_names):
+            problems.append("multiclass class names differ")
+        if not np.array_equal(candidate.gate.class_names, active.gate.class_names):
+            problems.append("gate class names differ")
+        for label, probs, reference in (("gate", gate_new, gate_old), ("multiclass", probs_new, probs_old)):
+            if probs.shape != reference.shape:
+                problems.append(f"{label} output shape {probs.shape} != {reference.shape}")
+            elif not np.all(np.isfinite(probs)):
+                problems.append(f"{label} probabilities are not finite")
+            elif not np.allclose(probs.sum(axis=1), 1.0, atol=1e-3):
+                problems.append(f"{label} probabilities do not sum to 1")
+        if problems:
+            return False, {"problems": problems}
+
+        report = accuracy_delta(probs_old, probs_new, active.model.class_names)
+        report["gate_agreement"] = float(np.mean(gate_old.argmax(axis=1) == gate_new.argmax(axis=1)))
+        if report["top1_agreement"] < self.min_agreement:
+            problems.append(f"top-1 agreement {report['top1_agreement']:.3f} < {self.min_agreement}")
+        report["problems"] = problems
+        return not problems, report
+
+    def reload(self):
+        """Load, validate, warm and swap in the current artifacts; return True if swapped."""
+        stamps = self._stat()
+        # Whatever happens, do not retry the same files on every poll
+        self._stamps = stamps
+        try:
+            gate, model = (load_profile(name) for name in self.names)
+        except Exception as e:
+            self.rejected += 1
+            logger.warning("Reload failed to load %s: %s: %s", "+".join(self.names), type(e).__name__, e)
+            return False
+        # Validated without the cache, so a rejected version never writes or evicts entries
+        candidate = Pipeline(gate, model)
+        if self.pipeline.shadow is not None:
+            candidate.attach_shadow(self.pipeline.shadow)
+        candidate.attach_audit(self.pipeline.audit)
+        if candidate.version == self.pipeline.version:
+            return False
+
+        ok, report = self.validate(candidate)
+        if not ok:
+            self.rejected += 1
+            logger.warning("Rejected %s version %s: %s", candidate.name, candidate.version, "; ".join(report["problems"]))
+            return False
+        candidate.cache = self.pipeline.cache
+        warm_cache(candidate)
+
+        with self._lock:
+            old = self._active
+            self._active = _Version(candidate)
+            if old.refs:
+                self._retired.append(old)
+        replace_profile(gate)
+        replace_profile(model)
+        candidate.purge_stale_cache()
+        self.reloads += 1
+        logger.info("Swapped %s %s -> %s (top-1 agreement %.3f, %d requests still on the old version)",
+                    candidate.name, old.pipeline.version, candidate.version, report["top1_agreement"], old.refs)
+        return True
+
+    def check(self):
+        """Reload if any artifact file changed since the last check."""
+        if self._stat() != self._stamps:
+            return self.reload()
+        return False
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception:
+                logger.exception("Artifact watcher failed")
+
+    def start(self):
+        """Start the watcher thread (no-op when the interval is 0 or it is already running)."""
+        if self.interval > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._watch, name="artifact-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "version": self._active.pipeline.version,
+                "reloads": self.reloads,
+                "rejected": self.rejected,
+                "in_flight": self._active.refs,
+                "draining": [v.refs for v in self._retired],
+            }
@@ -0,0 +1,29 @@
+"""Synthetic raw patient records over the input schema.
+
+Used by the export, parity and benchmark tools when no historical cases are
+at hand. Records follow the app's capture flow: a few symptom groups are
+enabled and some of their symptoms answered "Yes".
+"""
+
+import numpy as np
+import pandas as pd
+
+from inference.schema import disease_groups, features, states
+
+
+def synthetic_records(n, seed=0, group_rate=0.3, symptom_rate=0.35):
+    """Return a DataFrame of ``n`` raw records in feature order."""
+    rng = np.random.default_rng(seed)
+    data = {
+        'state_patient': rng.choice(states, size=n),
+        'gender': rng.choice(["Male", "Female"], size=n),
+        'durationofillness': rng.integers(1, 31, size=n),
+        'age_year': rng.integers(1, 91, size=n).astype(float),
+        'month': rng.integers(1, 13, size=n),
+    }
+    for symptoms in disease_groups.values():
+        enabled = rng.random(n) < group_rate
+        for symptom in symptoms:
+            yes = enabled & (rng.random(n) < symptom_rate)
+            data[symptom] = np.where(yes, "Yes", "No")
+    return pd.DataFrame(data, columns=features)
@@ -0,0 +1,90 @@
+"""Shared input schema for the virus prediction models.
+
+Feature order, state list and symptom groups are the ones the saved
+encoders and models were trained with; every app and serving component
+imports them from here so the column order cannot drift.
+"""
+
+# =============================
+# Data definitions
+# =============================
+states = [
+    'Andaman And Nicobar Islands', 'Andhra Pradesh', 'Arunachal Pradesh', 'Assam',
+    'Bihar', 'Chandigarh', 'Chhattisgarh', 'Delhi', 'Goa', 'Gujarat', 'Haryana',
+    'Himachal Pradesh', 'Jammu And Kashmir', 'Jharkhand', 'Karnataka', 'Kerala',
+    'Ladakh', 'Lakshadweep', 'Madhya Pradesh', 'Maharashtra', 'Manipur', 'Meghalaya',
+    'Mizoram', 'Nagaland', 'Odisha', 'Puducherry', 'Punjab', 'Rajasthan', 'Sikkim',
+    'Tamil Nadu', 'Telangana', 'The Dadra And Nagar Haveli And Daman And Diu',
+    'Tripura', 'Uttar Pradesh', 'Uttarakhand', 'West Bengal'
+]
+
+months = {
+    "January": 1, "February": 2, "March": 3, "April": 4,
+    "May": 5, "June": 6, "July": 7, "August": 8,
+    "September": 9, "October": 10, "November": 11, "December": 12
+}
+
+# =============================
+# Disease categories and symptoms
+# =============================
+disease_groups = {
+    "Diarrheal Diseases": [
+        'diarrhoea', 'dia_fever', 'dia_diarrhoea', 'dia_dysentery', 'dia_pain', 'dia_vomiting'
+    ],
+    "Respiratory Infections": [
+        'respiratory_c', 'res_sore', 'res_cough', 'res_rhinorrhoe', 'res_breath', 'res_fever'
+    ],
+    "Fever and Inflammatory Responses": [
+        'fev_fever', 'fev_any_loc_sym', 'rash_mac', 'rash_papule', 'rash_mac_pop',
+        'rash_eschar', 'rash_pustule', 'rash_bullae', 'rash_fev'
+    ],
+    "Jaundice and Hepatic Issues": [
+        'jaundice', 'jau_fever', 'jau_jaundice', 'jau_urine', 'jau_hep',
+        'jau_nausea', 'jau_vomiting', 'jau_abpain'
+    ],
+    "Neurological Symptoms (Encephalitis)": [
+        'encephalitis', 'enc_fever', 'enc_seizures', 'enc_rigidity', 'enc_sensorium',
+        'enc_ment_status', 'enc_somnelen', 'enc_irritab'
+    ],
+    "Hemorrhagic Symptoms": [
+        'hem_fever', 'hem_rigors', 'hem_headache', 'hem_chills', 'hem_malaise',
+        'hem_artharalgia', 'hem_myalgia', 'hem_hemanifestat',
+        'hem_retro_orbital'
+    ],
+    "Conjunctivitis Symptoms": [
+        'conjuctivities', 'con_fever', 'con_redness', 'con_discharge', 'con_scrusting'
+    ]
+}
+
+# ✅ Feature order must match your trained model
+features = [
+    'state_patient', 'gender', 'durationofillness', 'diarrhoea', 'dia_fever', 'dia_diarrhoea',
+    'dia_dysentery', 'dia_pain', 'dia_vomiting', 'respiratory_c', 'res_sore', 'res_cough',
+    'res_rhinorrhoe', 'res_breath', 'res_fever', 'fev_fever', 'fev_any_loc_sym', 'rash_mac',
+    'rash_papule', 'rash_mac_pop', 'rash_eschar', 'rash_pustule', 'rash_bullae', 'rash_fev',
+    'jaundice', 'jau_fever', 'jau_jaundice', 'jau_urine', 'jau_hep', 'jau_nausea', 'jau_vomiting',
+    'jau_abpain', 'encephalitis', 'enc_fever', 'enc_seizures', 'enc_rigidity', 'enc_sensorium',
+    'enc_ment_status', 'enc_somnelen', 'enc_irritab', 'hem_fever', 'hem_rigors', 'hem_headache',
+    'hem_chills', 'hem_malaise', 'hem_artharalgia', 'hem_myalgia', 'hem_hemanifestat',
+    'hem_retro_orbital', 'conjuctivities', 'con_fever', 'con_redness', 'con_discharge',
+    'con_scrusting', 'age_year', 'month'
+]
+
+symptom_display_names = {s: s.replace('_', ' ').title() for g in disease_groups.values() for s in g}
+
+# Every model column, for explanations; symptoms keep their display names
+feature_display_names = {
+    **{f: f.replace('_', ' ').title() for f in features},
+    **symptom_display_names,
+    'state_patient': 'State',
+    'durationofillness': 'Duration Of Illness',
+    'age_year': 'Age',
+}
+
+# Columns that are passed through as numbers instead of label-encoded
+numeric_features = ['durationofillness', 'age_year', 'month']
+
+# Flat symptom list in feature order (51 Yes/No columns)
+symptoms = [f for f in features if f in symptom_display_names]
+
+feature_index = {f: i for i, f in enumerate(features)}
@@ -0,0 +1,357 @@
+"""JSON-over-HTTP serving for batch clients, with a pre-fork worker pool.
+
+Endpoints:
+    POST /predict           {"records": [...], "k": 5}  dengue gate + ranked multiclass predictions
+    POST /score/<profile>   {"records": [...]}          probabilities from one model profile
+    POST /lab-tests         {"records": [...], "target": 0.9, "max_cost": null}  cheapest test panel per record
+    POST /seasonal-grid     {"records": [...], "class": null}  state x month probabilities per record
+    GET  /cube?by=state&virus=Dengue  prediction counts and mean confidence rolled up by the given axes
+    GET  /alerts            today's outbreak signals per (state, virus), shared by all workers
+    GET  /diagnostics       thread budget, loaded profiles and this worker's memory
+    GET  /metrics           coalescing, cache, hot reload and shadow scoring counters of this worker
+
+Records are the raw input dicts the apps build (``ordered_input``).
+
+``serve`` loads every available profile once in the parent, moves the
+loaded objects into the permanent GC generation with ``gc.freeze()`` (so
+collections in the workers never write to their pages) and then forks the
+workers, which share the model memory copy-on-write. TensorFlow and
+onnxruntime start native thread pools when a model is loaded, which do not
+survive a fork; those profiles are loaded inside each worker on first use.
+
+Each worker watches the gate and multiclass artifacts and swaps in new
+versions without a restart (``inference.reload``).
+"""
+
+import gc
+import json
+import logging
+import os
+import signal
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import joblib
+import numpy as np
+
+from inference import threads
+from inference.cube import PredictionCube
+from inference.grid import seasonal_grid
+from inference.labtests import LabTestCatalogue
+from inference.profiles import (BACKEND, PROFILE_ARTIFACTS, artifact_path, available_profiles, get_profile,
+                                loaded_profiles)
+from inference.reload import ReloadingPipeline
+from inference.surveillance import OutbreakDetector
+from inference.warmup import warm_cache
+
+logger = logging.getLogger(__name__)
+
+FORK_UNSAFE_SUFFIXES = (".keras", ".tflite")
+
+
+def fork_safe(name):
+    return BACKEND == "native" and not PROFILE_ARTIFACTS[name]["model"].endswith(FORK_UNSAFE_SUFFIXES)
+
+
+def preload(names=None):
+    """Load the fork-safe profiles among ``names`` (default: all available); return their names."""
+    loaded = []
+    for name in names or available_profiles():
+        if not fork_safe(name):
+            continue
+        try:
+            get_profile(name)
+        except Exception as e:
+            # e.g. model_n.pkl checked out as a Git LFS pointer
+            logger.warning("Skipping profile %s: %s: %s", name, type(e).__name__, e)
+            continue
+        loaded.append(name)
+    return loaded
+
+
+def memory_stats():
+    """Resident, proportional and private memory of this process in kB (Linux only)."""
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            lines = f.readlines()
+    except OSError:
+        return {}
+    stats = {}
+    for line in lines:
+        key, _, value = line.partition(":")
+        if value.strip().endswith("kB"):
+            stats[key] = int(value.split()[0])
+    keys = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+    return {k: stats[k] for k in keys if k in stats}
+
+
+def format_predictions(pipeline, gate_probs, ranking):
+    class_names = pipeline.model.class_names
+    gate_names = pipeline.gate.class_names
+    results = []
+    for gate_row, row in zip(gate_probs, ranking):
+        n = row["n_valid"]
+        results.append({
+            "gate": {str(name): float(p) for name, p in zip(gate_names, gate_row)},
+            "threshold": float(row["threshold"]),
+            "predictions": [
+                {"class": str(class_names[i]), "probability": float(p), "above_threshold": bool(above)}
+                for i, p, above in zip(row["class_index"][:n], row["prob"][:n], row["above_threshold"][:n])
+            ],
+        })
+    return results
+
+
+class Handler(BaseHTTPRequestHandler):
+    server_version = "SVPInference/1.0"
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_records(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        if not isinstance(body, dict):
+            raise ValueError("Request body must be a JSON object")
+        records = body.get("records")
+        if not isinstance(records, list) or not records or not all(isinstance(r, dict) for r in records):
+            raise ValueError("'records' must be a non-empty list of input dicts")
+        return body, records
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            handle = self.server.get_pipeline()
+            pipeline = handle.pipeline
+            return self._send(200, {
+                "pid": os.getpid(),
+                "coalescing": pipeline.flights.stats(),
+                "cache": pipeline.cache.stats() if pipeline.cache is not None else None,
+                "reload": handle.stats(),
+                "shadow": pipeline.shadow.stats() if pipeline.shadow is not None else None,
+                "audit": pipeline.audit.stats() if pipeline.audit is not None else None,
+                "surveillance": self.server.get_detector().stats(),
+                "cube": self.server.get_cube().stats(),
+            })
+        url = urlsplit(self.path)
+        if url.path == "/cube":
+            query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            by = [axis for axis in query.pop("by", "").split(",") if axis]
+            if "month" in query and query["month"].isdigit():
+                query["month"] = int(query["month"])
+            try:
+                table = self.server.get_cube().frame(by, **query)
+            except (KeyError, ValueError) as e:
+                return self._send(400, {"error": f"bad cube query: {e}"})
+            return self._send(200, {"rows": table.to_dict("records")})
+        if self.path == "/alerts":
+            return self._send(200, {"alerts": self.server.get_detector().active_alerts()})
+        if self.path != "/diagnostics":
+            return self._send(404, {"error": f"unknown path {self.path}"})
+        self._send(200, {
+            "pid": os.getpid(),
+            "threads": threads.diagnostics(),
+            "profiles": loaded_profiles(),
+            "memory_kb": memory_stats(),
+        })
+
+    def do_POST(self):
+        try:
+            body, records = self._read_records()
+            return self._post(body, records)
+        except (KeyError, ValueError) as e:
+            # Malformed body or records: missing fields, unknown categories, bad parameters
+            return self._send(400, {"error": f"{type(e).__name__}: {e}"})
+        except Exception as e:
+            logger.exception("POST %s failed", self.path)
+            return self._send(500, {"error": f"{type(e).__name__}: {e}"})
+
+    def _post(self, body, records):
+        if self.path == "/predict":
+            k = body.get("k", 5)
+            if isinstance(k, bool) or not isinstance(k, int) or k < 1:
+                raise ValueError("'k' must be a positive integer")
+            with self.server.get_pipeline().acquire() as pipeline:
+                gate_probs, ranking = pipeline.predict(records, k=k)
+                results = format_predictions(pipeline, gate_probs, ranking)
+                top = [pipeline.model.class_names[r["class_index"][0]] for r in ranking]
+                confidence = [r["prob"][0] for r in ranking]
+            self.server.get_detector().observe(records, top)
+            self.server.get_cube().add(records, top, confidence)
+            return self._send(200, {"results": results})
+
+        if self.path == "/lab-tests":
+            with self.server.get_pipeline().acquire() as pipeline:
+                gate_probs, probs = pipeline.predict_proba(records)
+                probs = np.where(pipeline.exclusion_mask(gate_probs, probs.shape[1]), 0.0, probs)
+                catalogue = self.server.get_lab_tests(pipeline.model.class_names)
+            panels = catalogue.recommend(probs, target=body.get("target", 0.9), max_cost=body.get("max_cost"))
+            return self._send(200, {"results": [
+                {
+                    "tests": [t.id for t in catalogue.panel(selection)],
+                    "cost": float(cost),
+                    "coverage": float(coverage),
+                    "turnaround_hours": float(turnaround),
+                }
+                for selection, cost, coverage, turnaround in zip(
+                    panels["tests"], panels["cost"], panels["coverage"], panels["turnaround_hours"])
+            ]})
+
+        if self.path == "/seasonal-grid":
+            results = []
+            with self.server.get_pipeline().acquire() as pipeline:
+                for record in records:
+                    grid = seasonal_grid(pipeline, record)
+                    # Default to the class with the highest average risk over the grid
+                    name = body.get("class") or str(grid.class_names[grid.probs.mean(axis=(0, 1)).argmax()])
+                    if name not in grid.class_names:
+                        return self._send(400, {"error": f"unknown class {name!r}"})
+                    results.append({
+                        "class": name,
+                        "probability": grid.class_grid(name).tolist(),
+                        "dengue_gate": grid.gate_dengue.tolist(),
+                    })
+            return self._send(200, {"states": grid.states, "months": grid.months, "results": results})
+
+        name = self.path[len("/score/"):] if self.path.startswith("/score/") else None
+        if name not in PROFILE_ARTIFACTS:
+            return self._send(404, {"error": f"unknown path {self.path}"})
+        if name not in available_profiles():
+            return self._send(404, {"error": f"profile {name} has no artifacts on disk"})
+        profile = get_profile(name)
+        self._send(200, {
+            "class_names": profile.class_names.tolist(),
+            "probabilities": profile.predict_records(records).tolist(),
+        })
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+class InferenceServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, gate="dengue", model="best_small_E"):
+        super().__init__(address, Handler)
+        self.pipeline_names = (gate, model)
+        self.pipeline = None
+        self.lab_tests = None
+        self.detector = None
+        self.cube = None
+
+    def get_pipeline(self):
+        # Built before the fork when both profiles are fork-safe, otherwise
+        # on the first request in each worker
+        if self.pipeline is None:
+            self.pipeline = ReloadingPipeline(*self.pipeline_names)
+        return self.pipeline
+
+    def get_detector(self):
+        # serve() creates it before the fork so all workers share its counts
+        if self.detector is None:
+            self.detector = OutbreakDetector(self.get_pipeline().pipeline.model.class_names)
+        return self.detector
+
+    def get_cube(self):
+        # Like the detector, shared by the workers when serve() creates it first
+        if self.cube is None:
+            self.cube = PredictionCube(self.get_pipeline().pipeline.model.class_names)
+        return self.cube
+
+    def get_lab_tests(self, class_names):
+        if self.lab_tests is None:
+            self.lab_tests = LabTestCatalogue.load(class_names)
+        return self.lab_tests
+
+
+def _class_names(name):
+    """Class names of a profile without loading a model that must not be loaded before the fork."""
+    spec = PROFILE_ARTIFACTS[name]
+    if fork_safe(name) or spec["label_encoder_y"] is None:
+        return get_profile(name).class_names
+    return np.asarray(joblib.load(artifact_path(spec["label_encoder_y"])).classes_).astype(str)
+
+
+def _run_in_child(fn):
+    """Run ``fn`` in a short-lived child so the parent never starts model thread pools."""
+    pid = os.fork()
+    if pid == 0:
+        try:
+            fn()
+        except Exception:
+            logger.exception("Child task failed")
+            os._exit(1)
+        os._exit(0)
+    os.waitpid(pid, 0)
+
+
+def _run_worker(httpd):
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    # Threads do not survive fork(); each worker runs its own watcher
+    httpd.get_pipeline().start()
+    try:
+        httpd.serve_forever()
+    finally:
+        os._exit(0)
+
+
+def serve(host="0.0.0.0", port=8000, workers=1, gate="dengue", model="best_small_E"):
+    start = time.perf_counter()
+    httpd = InferenceServer((host, port), gate, model)
+    loaded = preload()
+    if all(fork_safe(name) for name in httpd.pipeline_names):
+        httpd.get_pipeline()
+    logger.info("Loaded %d profiles in %.1fs: %s", len(loaded), time.perf_counter() - start, ", ".join(loaded))
+    httpd.detector = OutbreakDetector(_class_names(model))
+    httpd.cube = PredictionCube(_class_names(model))
+
+    # The cache is on disk and shared, so one throwaway process seeds it for every worker
+    _run_in_child(lambda: warm_cache(httpd.get_pipeline().pipeline))
+
+    # Everything allocated so far is shared with the workers; keep the
+    # collector from touching it again
+    gc.collect()
+    gc.freeze()
+
+    if workers <= 1:
+        logger.info("Serving on %s:%d", host, port)
+        httpd.get_pipeline().start()
+        httpd.serve_forever()
+        return
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            _run_worker(httpd)
+        return pid
+
+    children = {spawn() for _ in range(workers)}
+    logger.info("Serving on %s:%d with %d workers (pids %s)", host, port, workers,
+                ", ".join(map(str, sorted(children))))
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            os.kill(pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        children.discard(pid)
+        if not stopping:
+            logger.warning("Worker %d exited with status %d, restarting", pid, status)
+            children.add(spawn())
+    httpd.server_close()
@@ -0,0 +1,118 @@
+"""Shadow scoring of a candidate multiclass model on live traffic.
+
+``Pipeline.predict_proba`` hands every scored batch to
+``ShadowScorer.submit``, which only does a non-blocking put on a bounded
+queue: when the queue is full the batch is dropped and counted, so the
+served prediction never waits on the candidate. A daemon thread scores
+queued batches with the candidate profile and records its latency and how
+often its top-1 class disagrees with the served model.
+
+Enable with ``SVP_SHADOW_MODEL=<profile name>`` (e.g. ``xgb_best_small_E``).
+"""
+
+import collections
+import logging
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SHADOW_MODEL = os.environ.get("SVP_SHADOW_MODEL") or None
+SHADOW_QUEUE_SIZE = int(os.environ.get("SVP_SHADOW_QUEUE_SIZE", 1000))
+# Latency percentiles are computed over this many recent batches
+LATENCY_WINDOW = 1000
+
+
+class ShadowScorer:
+    def __init__(self, candidate, reference_classes, queue_size=SHADOW_QUEUE_SIZE):
+        self.candidate = candidate
+        # Map candidate class indices onto the served model's class order
+        reference_classes = np.asarray(reference_classes)
+        lookup = {name: i for i, name in enumerate(reference_classes)}
+        self._class_map = np.array([lookup.get(name, -1) for name in candidate.class_names])
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._latencies = collections.deque(maxlen=LATENCY_WINDOW)
+        self._flips = collections.Counter()
+        self._reference_classes = reference_classes
+        self.submitted = 0
+        self.dropped = 0
+        self.scored = 0
+        self.disagreements = 0
+        self.errors = 0
+        self._thread = None
+
+    def submit(self, records, X, served_probs):
+        """Queue a served batch for shadow scoring; never blocks.
+
+        ``X`` is the served model's encoding, reused when the candidate reads
+        the same columns; otherwise ``records`` are encoded in the background.
+        """
+        # Started on first use so a pre-forked worker gets its own thread
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name=f"shadow-{self.candidate.name}",
+                                                    daemon=True)
+                    self._thread.start()
+        try:
+            self._queue.put_nowait((records, X, served_probs))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        with self._lock:
+            self.submitted += 1
+        return True
+
+    def _run(self):
+        while True:
+            records, X, served_probs = self._queue.get()
+            try:
+                self._score(records, X, served_probs)
+            except Exception:
+                with self._lock:
+                    self.errors += 1
+                logger.exception("Shadow scoring with %s failed", self.candidate.name)
+
+    def _score(self, records, X, served_probs):
+        start = time.perf_counter()
+        if X is None:
+            X = self.candidate.encode(records)
+        probs = self.candidate.predict_proba(X)
+        elapsed = time.perf_counter() - start
+
+        served_top = np.asarray(served_probs).argmax(axis=1)
+        shadow_top = self._class_map[probs.argmax(axis=1)]
+        differ = np.flatnonzero(served_top != shadow_top)
+        with self._lock:
+            self._latencies.append(elapsed)
+            self.scored += len(served_top)
+            self.disagreements += len(differ)
+            for i in differ:
+                served = self._reference_classes[served_top[i]]
+                shadow = self._reference_classes[shadow_top[i]] if shadow_top[i] >= 0 else "<unknown class>"
+                self._flips[(str(served), str(shadow))] += 1
+
+    def stats(self, top_flips=5):
+        with self._lock:
+            latencies = np.array(self._latencies) * 1000
+            return {
+                "candidate": self.candidate.name,
+                "submitted": self.submitted,
+                "dropped": self.dropped,
+                "queued": self._queue.qsize(),
+                "scored_rows": self.scored,
+                "errors": self.errors,
+                "disagreement_rate": self.disagreements / self.scored if self.scored else None,
+                "latency_ms_p50": float(np.percentile(latencies, 50)) if len(latencies) else None,
+                "latency_ms_p95": float(np.percentile(latencies, 95)) if len(latencies) else None,
+                "top_flips": [
+                    {"served": served, "shadow": shadow, "count": count}
+                    for (served, shadow), count in self._flips.most_common(top_flips)
+                ],
+            }
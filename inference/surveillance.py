@@ -0,0 +1,173 @@
+"""Streaming outbreak signals over the scored predictions.
+
+``OutbreakDetector.observe`` counts each scored case under its state and
+top-ranked virus in a per-(state, virus) ring buffer of daily counts, and
+tests only the cells the batch touched, so the cost is constant per case
+and history is never re-read:
+
+- EARS C2: today's count against the mean and standard deviation of the
+  ``window`` days ending ``lag`` days ago (the lag keeps a slowly growing
+  outbreak out of its own baseline);
+- CUSUM: the running sum of daily C2 scores above ``cusum_k``, folded in
+  once per completed day with a full baseline, plus today's score so far.
+  Days without any traffic count as zero cases.
+
+A cell alerts once per day, when either statistic crosses its threshold
+with at least ``min_count`` cases today. Alerts are logged, and ``active_alerts``
+lists today's alerting cells. No cell alerts until ``window + lag`` days have been
+observed, since the baseline would be empty.
+
+The buffers live in anonymous shared memory and are updated under a
+process-shared lock, so a detector created before the server forks counts
+the traffic of every worker.
+"""
+
+import datetime
+import logging
+import mmap
+import multiprocessing
+import time
+
+import numpy as np
+
+from inference.schema import states
+
+logger = logging.getLogger(__name__)
+
+DAY_SECONDS = 86400
+# Lower bound on the baseline standard deviation; quiet cells have none
+SIGMA_FLOOR = 1.0
+_state_index = {s: i for i, s in enumerate(states)}
+
+
+def shared_array(shape, dtype):
+    """A zeroed array in anonymous shared memory, visible to processes forked after it."""
+    buffer = mmap.mmap(-1, max(1, int(np.prod(shape)) * np.dtype(dtype).itemsize))
+    return np.frombuffer(buffer, dtype=dtype, count=int(np.prod(shape))).reshape(shape)
+
+
+class OutbreakDetector:
+    def __init__(self, class_names, window=7, lag=2, threshold=3.0, cusum_k=0.5, cusum_h=4.0, min_count=3,
+                 clock=time.time):
+        self.class_names = np.asarray(class_names).astype(str)
+        self._class_index = {name: i for i, name in enumerate(self.class_names)}
+        self.window, self.lag = window, lag
+        self.threshold, self.cusum_k, self.cusum_h = threshold, cusum_k, cusum_h
+        self.min_count = min_count
+        self.clock = clock
+
+        self.size = window + lag + 1
+        shape = (len(states), len(self.class_names))
+        self._counts = shared_array(shape + (self.size,), np.int32)
+        self._cusum = shared_array(shape, np.float64)
+        self._alerted = shared_array(shape, np.bool_)
+        # current day, first day observed, cases observed
+        self._clock_state = shared_array((3,), np.int64)
+        self._clock_state[:2] = -1
+        self._lock = multiprocessing.Lock()
+
+    def _baseline(self, day, s, c):
+        """Mean and floored sd of the baseline days of ``day`` for cells ``(s, c)``."""
+        days = np.arange(day - self.lag - self.window, day - self.lag)
+        base = self._counts[s, c][..., days % self.size]
+        return base.mean(axis=-1), np.maximum(base.std(axis=-1, ddof=1), SIGMA_FLOOR)
+
+    def _advance(self, day):
+        """Close the days before ``day``: fold each into CUSUM, then clear the slot the next day reuses."""
+        current, first = (int(v) for v in self._clock_state[:2])
+        if current < 0:
+            self._clock_state[:2] = day
+            return
+        if day <= current:
+            return
+        # After ``size`` days every slot has been cleared, so further quiet days all score 0
+        last = min(day, current + self.size)
+        for closed in range(current, last):
+            # A day is only scored once its baseline is fully observed
+            if closed - first >= self.window + self.lag:
+                mean, sd = self._baseline(closed, slice(None), slice(None))
+                score = (self._counts[:, :, closed % self.size] - mean) / sd
+                self._cusum[:] = np.maximum(0.0, self._cusum + score - self.cusum_k)
+            # Days without traffic count as no cases, not as the day ``size`` earlier
+            self._counts[:, :, (closed + 1) % self.size] = 0
+        quiet = day - max(last, first + self.window + self.lag)
+        if quiet > 0:
+            self._cusum[:] = np.maximum(0.0, self._cusum - quiet * self.cusum_k)
+        self._alerted[:] = False
+        self._clock_state[0] = day
+
+    def _scores(self, day, s, c):
+        count = self._counts[s, c, day % self.size]
+        mean, sd = self._baseline(day, s, c)
+        c2 = (count - mean) / sd
+        return count, mean, sd, c2, np.maximum(0.0, self._cusum[s, c] + c2 - self.cusum_k)
+
+    def _alert(self, day, s, c, count, mean, sd, c2, cusum):
+        return {
+            "state": states[s],
+            "virus": str(self.class_names[c]),
+            "day": datetime.date.fromordinal(datetime.date(1970, 1, 1).toordinal() + int(day)).isoformat(),
+            "count": int(count),
+            "baseline_mean": float(mean),
+            "baseline_sd": float(sd),
+            "ears_c2": float(c2),
+            "cusum": float(cusum),
+        }
+
+    def observe(self, records, viruses, now=None):
+        """Count scored cases (raw records and their top-ranked virus names); return new alerts."""
+        s, c = [], []
+        for record, virus in zip(records, viruses):
+            state, virus = _state_index.get(record.get("state_patient")), self._class_index.get(str(virus))
+            if state is not None and virus is not None:
+                s.append(state)
+                c.append(virus)
+        if not s:
+            return []
+        s, c = np.array(s), np.array(c)
+
+        day = int((self.clock() if now is None else now) // DAY_SECONDS)
+        with self._lock:
+            self._advance(day)
+            # Late cases count towards the current day
+            day = int(self._clock_state[0])
+            np.add.at(self._counts[:, :, day % self.size], (s, c), 1)
+            self._clock_state[2] += len(s)
+            if day - self._clock_state[1] < self.window + self.lag:
+                return []
+
+            cells = np.unique(s * len(self.class_names) + c)
+            s, c = np.divmod(cells, len(self.class_names))
+            count, mean, sd, c2, cusum = self._scores(day, s, c)
+            fire = (((c2 > self.threshold) | (cusum > self.cusum_h)) & (count >= self.min_count)
+                    & ~self._alerted[s, c])
+            self._alerted[s[fire], c[fire]] = True
+
+        alerts = [self._alert(day, *cell) for cell in zip(s[fire], c[fire], count[fire], mean[fire], sd[fire],
+                                                             c2[fire], cusum[fire])]
+        for alert in alerts:
+            logger.warning("Outbreak signal: %(virus)s in %(state)s on %(day)s, %(count)d cases "
+                           "(baseline %(baseline_mean).1f ± %(baseline_sd).1f, C2 %(ears_c2).1f, "
+                           "CUSUM %(cusum).1f)", alert)
+        return alerts
+
+    def active_alerts(self):
+        """Today's alerting cells with their current statistics, from the shared buffers."""
+        with self._lock:
+            day = int(self._clock_state[0])
+            s, c = np.nonzero(self._alerted)
+            if not len(s):
+                return []
+            scores = self._scores(day, s, c)
+        return [self._alert(day, *cell) for cell in zip(s, c, *scores)]
+
+    def stats(self):
+        with self._lock:
+            day, first, cases = (int(v) for v in self._clock_state)
+            alerting = int(self._alerted.sum())
+        return {
+            "cases": cases,
+            "days_observed": 0 if first < 0 else day - first + 1,
+            "warming_up": first < 0 or day - first < self.window + self.lag,
+            "alerting_cells": alerting,
+        }
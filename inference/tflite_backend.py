@@ -0,0 +1,57 @@
+"""Serve a TFLite export of the Bi-LSTM without importing full TensorFlow.
+
+The interpreter comes from ``ai_edge_litert`` (or the older
+``tflite_runtime``); ``tensorflow.lite`` is only used when neither is
+installed. Artifacts are written by ``tools/export_tflite.py`` with a fixed
+batch dimension (recurrent layers do not convert with a dynamic one), so
+larger inputs are scored in padded chunks of that size.
+"""
+
+import threading
+
+import numpy as np
+
+from inference import threads
+
+
+def _interpreter_class():
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+    except ImportError:
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            from tensorflow.lite import Interpreter
+    return Interpreter
+
+
+class TFLiteServing:
+    def __init__(self, path, num_threads=None):
+        self.path = path
+        self.interpreter = _interpreter_class()(model_path=path, num_threads=num_threads or threads.budget().threads)
+        self.interpreter.allocate_tensors()
+        inp = self.interpreter.get_input_details()[0]
+        out = self.interpreter.get_output_details()[0]
+        self._input = inp["index"]
+        self._output = out["index"]
+        self.batch_size = int(inp["shape"][0])
+        self.input_shape = tuple(int(d) for d in inp["shape"][1:])
+        # A tflite Interpreter must not be invoked from two threads at once
+        self._lock = threading.Lock()
+
+    def predict_proba(self, X):
+        X = np.asarray(X, dtype=np.float32).reshape((-1,) + self.input_shape)
+        n = len(X)
+        b = self.batch_size
+        padded = -n % b
+        if padded:
+            X = np.concatenate([X, np.zeros((padded,) + self.input_shape, dtype=np.float32)])
+        chunks = []
+        with self._lock:
+            for start in range(0, len(X), b):
+                self.interpreter.set_tensor(self._input, X[start:start + b])
+                self.interpreter.invoke()
+                chunks.append(self.interpreter.get_tensor(self._output).copy())
+        return np.concatenate(chunks)[:n]
+
+    predict = predict_proba
@@ -0,0 +1,164 @@
+"""Per-process CPU thread budget shared by every native thread pool.
+
+XGBoost/OpenMP, the BLAS behind NumPy and sklearn, onnxruntime and
+TensorFlow each size their pools to "all cores" by default, so N app
+workers on one host start roughly N x libraries x cores threads.
+``configure`` runs once, before any model is loaded (importing ``inference``
+calls it): it finds the usable cores (CPU affinity, capped by the cgroup CPU
+quota), splits them across ``SVP_WORKERS`` workers and pins each pool to
+that share. ``SVP_THREADS`` sets the per-worker count directly.
+
+Run ``python -m inference.threads`` to print the chosen budget.
+"""
+
+import json
+import logging
+import math
+import os
+import sys
+from dataclasses import asdict, dataclass
+
+logger = logging.getLogger(__name__)
+
+# Read by OpenMP runtimes and BLAS builds when they initialise
+THREAD_ENV_VARS = (
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "BLIS_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+    "TF_NUM_INTRAOP_THREADS",
+)
+# threadpoolctl ``internal_api`` of the runtime each variable configures
+RUNTIME_APIS = {
+    "OMP_NUM_THREADS": "openmp",
+    "OPENBLAS_NUM_THREADS": "openblas",
+    "MKL_NUM_THREADS": "mkl",
+    "BLIS_NUM_THREADS": "blis",
+}
+# Requests are served one op graph at a time; a single inter-op thread is enough
+TF_INTEROP_THREADS = 1
+
+
+@dataclass(frozen=True)
+class ThreadBudget:
+    cpu_count: int
+    affinity: int
+    cgroup_quota: float
+    cores: int
+    workers: int
+    threads: int
+    source: str
+
+
+def cgroup_cpu_quota():
+    """CPU quota in cores from cgroup v2 ``cpu.max`` or v1 ``cfs_quota_us``; None when unlimited."""
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        return None if quota == "max" else int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period = int(f.read())
+        return None if quota <= 0 else quota / period
+    except (OSError, ValueError):
+        return None
+
+
+def available_cores():
+    """``(cpu_count, affinity, cgroup quota, usable cores)`` for this process."""
+    cpu_count = os.cpu_count() or 1
+    affinity = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else cpu_count
+    quota = cgroup_cpu_quota()
+    cores = affinity if quota is None else max(1, min(affinity, math.floor(quota)))
+    return cpu_count, affinity, quota, cores
+
+
+_budget = None
+# Thread variables the operator set before ``configure`` ran
+_explicit = frozenset()
+
+
+def configure(workers=None, threads=None):
+    """Compute the budget once per process and pin the thread pools to it."""
+    global _budget, _explicit
+    if _budget is not None:
+        return _budget
+
+    cpu_count, affinity, quota, cores = available_cores()
+    workers = max(1, workers or int(os.environ.get("SVP_WORKERS", 1)))
+    threads = threads or int(os.environ.get("SVP_THREADS", 0))
+    source = "SVP_THREADS" if threads else "auto"
+    threads = threads or max(1, cores // workers)
+    _budget = ThreadBudget(cpu_count, affinity, quota, cores, workers, threads, source)
+
+    # Explicit operator settings win over the computed budget
+    _explicit = frozenset(var for var in THREAD_ENV_VARS + ("TF_NUM_INTEROP_THREADS",) if var in os.environ)
+    for var in THREAD_ENV_VARS:
+        os.environ.setdefault(var, str(threads))
+    os.environ.setdefault("TF_NUM_INTEROP_THREADS", str(TF_INTEROP_THREADS))
+    # BLAS/OpenMP libraries loaded before this point (numpy is usually
+    # imported first) no longer read the environment; limit them at runtime,
+    # except those whose variable the operator set
+    limits = {api: threads for var, api in RUNTIME_APIS.items() if var not in _explicit}
+    if limits:
+        try:
+            from threadpoolctl import threadpool_limits
+            threadpool_limits(limits=limits)
+        except ImportError:
+            pass
+    if "tensorflow" in sys.modules:
+        configure_tensorflow()
+
+    logger.info("Thread budget: %d threads per worker (%d cores, %d workers, %s)",
+                threads, cores, workers, source)
+    return _budget
+
+
+def budget():
+    return configure()
+
+
+def configure_tensorflow():
+    """Pin TensorFlow's pools; call right after importing tensorflow, before the first op runs."""
+    import tensorflow as tf
+
+    budget()
+    try:
+        # TF_NUM_*_THREADS set by the operator already apply when the runtime starts
+        if "TF_NUM_INTRAOP_THREADS" not in _explicit:
+            tf.config.threading.set_intra_op_parallelism_threads(budget().threads)
+        if "TF_NUM_INTEROP_THREADS" not in _explicit:
+            tf.config.threading.set_inter_op_parallelism_threads(TF_INTEROP_THREADS)
+    except RuntimeError:
+        # Runtime already initialised; TF_NUM_*_THREADS applied if it started after configure()
+        pass
+
+
+def diagnostics():
+    """Chosen budget plus the thread counts each loaded library actually reports."""
+    info = {"budget": asdict(budget()), "env": {var: os.environ.get(var) for var in THREAD_ENV_VARS}}
+    try:
+        from threadpoolctl import threadpool_info
+        info["threadpools"] = [
+            {"api": p["internal_api"], "library": os.path.basename(p["filepath"]), "threads": p["num_threads"]}
+            for p in threadpool_info()
+        ]
+    except ImportError:
+        pass
+    if "tensorflow" in sys.modules:
+        import tensorflow as tf
+        info["tensorflow"] = {
+            "intra_op": tf.config.threading.get_intra_op_parallelism_threads(),
+            "inter_op": tf.config.threading.get_inter_op_parallelism_threads(),
+        }
+    return info
+
+
+if __name__ == "__main__":
+    print(json.dumps(diagnostics(), indent=2))
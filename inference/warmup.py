@@ -0,0 +1,72 @@
+"""Seed the prediction cache with the most frequent historical inputs at startup.
+
+A small number of symptom combinations make up most traffic. The frequency
+table written by ``tools/frequency_table.py`` holds one row per distinct
+past input, encoded with the multiclass profile's encoders, plus a
+``count`` column. ``warm_cache`` decodes the top-N rows back to raw records
+and scores them through the pipeline in one batch, which stores every row
+in the prediction cache, so the first users after a deploy get cache hits.
+"""
+
+import logging
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from inference.profiles import artifact_path
+from inference.schema import features
+
+logger = logging.getLogger(__name__)
+
+WARMUP_TABLE = os.environ.get("SVP_WARMUP_TABLE", artifact_path("profile_frequencies.csv"))
+WARMUP_TOP_N = int(os.environ.get("SVP_WARMUP_TOP_N", 5000))
+# Decodes to a value no LabelEncoder knows, i.e. back to -1
+UNKNOWN = "__unknown__"
+
+
+def decode(X, encoders):
+    """Map an encoded (N, 56) matrix back to a DataFrame of raw records."""
+    X = np.asarray(X)
+    data = {}
+    for idx, name in enumerate(features):
+        if name in encoders:
+            classes = np.asarray(encoders[name].classes_).astype(str)
+            codes = X[:, idx].astype(np.intp)
+            known = (codes >= 0) & (codes < len(classes))
+            data[name] = np.where(known, classes[np.where(known, codes, 0)], UNKNOWN)
+        else:
+            data[name] = X[:, idx]
+    return pd.DataFrame(data, columns=features)
+
+
+def load_frequency_table(path):
+    table = pd.read_csv(path)
+    missing = [c for c in features + ["count"] if c not in table.columns]
+    if missing:
+        raise ValueError(f"{path} is missing columns: {', '.join(missing)}")
+    return table.sort_values("count", ascending=False, kind="stable").reset_index(drop=True)
+
+
+def warm_cache(pipeline, path=WARMUP_TABLE, top_n=WARMUP_TOP_N):
+    """Score the ``top_n`` most frequent inputs into the cache; return a summary or None if skipped."""
+    if pipeline.cache is None or not path or not os.path.exists(path):
+        logger.info("Cache warmup skipped (cache %s, table %s)",
+                    "off" if pipeline.cache is None else "on", path or "unset")
+        return None
+
+    start = time.perf_counter()
+    table = load_frequency_table(path)
+    top = table.head(top_n)
+    hits_before = pipeline.cache.hits
+    pipeline.predict_proba(decode(top[features].to_numpy(), pipeline.model.encoders), shadow=False)
+    summary = {
+        "profiles": len(top),
+        "already_cached": pipeline.cache.hits - hits_before,
+        "seconds": time.perf_counter() - start,
+        "coverage": float(top["count"].sum() / table["count"].sum()) if len(table) else 0.0,
+    }
+    logger.info("Cache warmup: %d profiles (%d already cached) in %.2fs, covering %.1f%% of historical traffic",
+                summary["profiles"], summary["already_cached"], summary["seconds"], 100 * summary["coverage"])
+    return summary
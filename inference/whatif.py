@@ -0,0 +1,66 @@
+"""What-if sensitivity of one patient record, scored as a single batch.
+
+``what_if_records`` expands a raw record into the record itself followed by
+every single-symptom flip and sweeps over age, duration and month (about
+80 rows). ``sensitivity`` scores the whole matrix with one
+``predict_proba`` call per model through the pipeline, and reports, for
+each variation, the class whose probability moved most and the change in
+the dengue gate.
+"""
+
+import numpy as np
+import pandas as pd
+
+from inference.schema import features, months, symptom_display_names, symptoms
+
+AGE_SWEEP = [1, 5, 10, 18, 30, 45, 60, 75, 90]
+DURATION_SWEEP = [1, 2, 3, 5, 7, 10, 14, 21, 30]
+MONTH_NAMES = {number: name for name, number in months.items()}
+
+
+def what_if_records(record):
+    """Return ``(DataFrame of variations, labels)``; row 0 is ``record`` unchanged."""
+    base = {f: record.get(f, "No") for f in features}
+    rows, labels = [base], ["As entered"]
+
+    for symptom in symptoms:
+        flipped = "No" if base[symptom] == "Yes" else "Yes"
+        rows.append({**base, symptom: flipped})
+        labels.append(f"{symptom_display_names[symptom]}: {base[symptom]} → {flipped}")
+    for age in AGE_SWEEP:
+        if age != base["age_year"]:
+            rows.append({**base, "age_year": float(age)})
+            labels.append(f"Age {age} years")
+    for days in DURATION_SWEEP:
+        if days != base["durationofillness"]:
+            rows.append({**base, "durationofillness": days})
+            labels.append(f"Duration {days} days")
+    for number, name in MONTH_NAMES.items():
+        if number != base["month"]:
+            rows.append({**base, "month": number})
+            labels.append(f"Month {name}")
+    return pd.DataFrame(rows, columns=features), labels
+
+
+def sensitivity(pipeline, record):
+    """Score every variation of ``record``; return a DataFrame sorted by the largest probability shift."""
+    variations, labels = what_if_records(record)
+    gate_probs, probs = pipeline.predict_proba(variations, shadow=False, cache=False)
+    gate_dengue = 0 if pipeline.gate.dengue_index is None else pipeline.gate.dengue_index
+    class_names = pipeline.model.class_names
+
+    shift = probs[1:] - probs[0]
+    moved = np.abs(shift).argmax(axis=1)
+    rows = np.arange(len(shift))
+    top = probs[1:].argmax(axis=1)
+    table = pd.DataFrame({
+        "change": labels[1:],
+        "class_moved_most": class_names[moved],
+        "shift": shift[rows, moved],
+        "top_class": class_names[top],
+        "top_probability": probs[1:][rows, top],
+        "dengue_gate": gate_probs[1:, gate_dengue],
+        "dengue_gate_shift": gate_probs[1:, gate_dengue] - gate_probs[0, gate_dengue],
+    })
+    order = np.argsort(-np.abs(table["shift"].to_numpy()), kind="stable")
+    return table.iloc[order].reset_index(drop=True)
@@ -0,0 +1,43 @@
+"""In-place XGBoost prediction with a pinned per-process thread count.
+
+``XGBClassifier.predict_proba`` on a DataFrame builds a DMatrix for every
+call and lets OpenMP start one thread per core; with several Streamlit
+sessions predicting at once the host ends up oversubscribed.
+``XGBoostServing`` calls ``Booster.inplace_predict`` on a contiguous float32
+array instead (no DMatrix, thread-safe for concurrent callers) and pins
+``nthread`` to this worker's thread budget (``inference.threads``).
+"""
+
+import numpy as np
+
+from inference import threads
+
+
+def is_xgboost_model(model):
+    return type(model).__module__.split(".")[0] == "xgboost" and hasattr(model, "get_booster")
+
+
+class XGBoostServing:
+    def __init__(self, model, nthread=None):
+        self.model = model
+        self.booster = model.get_booster()
+        self.nthread = nthread or threads.budget().threads
+        self.booster.set_param({"nthread": self.nthread})
+        self.classes_ = model.classes_
+        self.missing = model.missing
+        # Honour early stopping the same way XGBClassifier.predict_proba does;
+        # best_iteration only exists on boosters trained with it
+        try:
+            self.iteration_range = (0, model.best_iteration + 1)
+        except AttributeError:
+            self.iteration_range = (0, 0)
+
+    def predict_proba(self, X):
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        probs = self.booster.inplace_predict(
+            X, iteration_range=self.iteration_range, missing=self.missing, validate_features=False
+        )
+        if probs.ndim == 1:
+            # binary:logistic returns P(class 1) only
+            probs = np.column_stack([1.0 - probs, probs])
+        return probs
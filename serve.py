@@ -0,0 +1,31 @@
+"""Pre-fork HTTP server for batch and API clients (see inference/server.py).
+
+Usage:
+    python serve.py --workers 4 --port 8000
+    curl -X POST localhost:8000/predict -d '{"records": [{...}], "k": 5}'
+"""
+
+import argparse
+import logging
+import os
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--gate", default="dengue")
+    parser.add_argument("--model", default="best_small_E")
+    args = parser.parse_args()
+
+    # The per-worker thread budget is fixed when ``inference`` is first imported
+    os.environ.setdefault("SVP_WORKERS", str(args.workers))
+    from inference.server import serve
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(process)d %(name)s: %(message)s")
+    serve(args.host, args.port, args.workers, args.gate, args.model)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Build the similar-case index from confirmed historical cases.
+
+Usage:
+    python -m tools.build_case_index --cases 2023.csv 2024.csv --label-column virus
+    python -m tools.build_case_index --n-synthetic 1000000     # demo index, labelled by the model
+
+Each CSV holds raw records over the ``features`` schema plus the confirmed
+virus. Synthetic cases take the multiclass profile's top prediction as
+their label, which is only useful to try the index out. Writes
+``case_index.npz`` (read by ``inference.cases``).
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from inference.cases import CASE_INDEX, CaseIndex
+from inference.sampling import synthetic_records
+from inference.schema import features
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", nargs="*", default=[], help="CSVs of raw historical records with the confirmed virus")
+    parser.add_argument("--label-column", default="virus")
+    parser.add_argument("--n-synthetic", type=int, default=0)
+    parser.add_argument("--profile", default="best_small_E", help="profile that labels synthetic cases")
+    parser.add_argument("--out", default=CASE_INDEX)
+    args = parser.parse_args()
+
+    records, viruses = [], []
+    for path in args.cases:
+        frame = pd.read_csv(path)
+        records.append(frame[features])
+        viruses.append(frame[args.label_column].astype(str).to_numpy())
+    if args.n_synthetic:
+        from inference.profiles import get_profile
+
+        profile = get_profile(args.profile)
+        synthetic = synthetic_records(args.n_synthetic)
+        records.append(synthetic)
+        viruses.append(profile.class_names[profile.predict_records(synthetic).argmax(axis=1)])
+    if not records:
+        parser.error("give --cases and/or --n-synthetic")
+
+    index = CaseIndex.from_records(pd.concat(records, ignore_index=True), np.concatenate(viruses))
+    index.save(args.out)
+    print(f"Wrote {args.out}: {len(index)} cases, {len(index.slices[(None, None)].patterns)} distinct symptom "
+          f"patterns, {len(index.virus_names)} viruses")
+
+
+if __name__ == "__main__":
+    main()
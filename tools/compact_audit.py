@@ -0,0 +1,74 @@
+"""Rewrite finished days of the prediction audit log as Parquet.
+
+Usage:
+    python -m tools.compact_audit                 # every day before today (UTC)
+    python -m tools.compact_audit --keep          # leave the .arrows files in place
+
+The serving processes append Arrow IPC streams, one file per worker and
+day (``inference.audit``). For each finished day this reads them all and
+writes ``audit-<date>.parquet`` (zstd, one row group per 100k rows); a day
+whose files differ in schema, e.g. a model reload changed the number of
+classes, gets one Parquet file per schema. The stream files are deleted
+once their Parquet file is written.
+"""
+
+import argparse
+import datetime
+import glob
+import os
+import re
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from inference.audit import AUDIT_DIR
+
+ROW_GROUP_SIZE = 100_000
+_name = re.compile(r"audit-(\d{4}-\d{2}-\d{2})-\d+-\d+\.arrows$")
+
+
+def finished_days(directory, today):
+    days = {}
+    for path in sorted(glob.glob(os.path.join(directory, "audit-*.arrows"))):
+        match = _name.search(os.path.basename(path))
+        if match and match.group(1) < today:
+            days.setdefault(match.group(1), []).append(path)
+    return days
+
+
+def compact_day(directory, day, paths):
+    by_schema = {}
+    for path in paths:
+        with pa.OSFile(path, "rb") as source:
+            table = pa.ipc.open_stream(source).read_all()
+        by_schema.setdefault(table.schema, []).append(table)
+    written = []
+    for i, tables in enumerate(by_schema.values()):
+        out = os.path.join(directory, f"audit-{day}.parquet" if i == 0 else f"audit-{day}-{i}.parquet")
+        table = pa.concat_tables(tables).sort_by("timestamp")
+        pq.write_table(table, out + ".tmp", compression="zstd", row_group_size=ROW_GROUP_SIZE)
+        os.replace(out + ".tmp", out)
+        written.append((out, table.num_rows))
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dir", default=AUDIT_DIR)
+    parser.add_argument("--keep", action="store_true", help="keep the stream files after compacting")
+    args = parser.parse_args()
+
+    today = datetime.datetime.now(datetime.timezone.utc).date().isoformat()
+    days = finished_days(args.dir, today)
+    if not days:
+        print(f"Nothing to compact in {args.dir}")
+    for day, paths in sorted(days.items()):
+        for out, rows in compact_day(args.dir, day, paths):
+            print(f"Wrote {out}: {rows} rows from {len(paths)} stream files")
+        if not args.keep:
+            for path in paths:
+                os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Distill a slow teacher profile into a compact XGBoost student.
+
+Usage:
+    python -m tools.distill --teacher bi_lstm_E
+    python -m tools.distill --teacher n --cases historical.csv --n-synthetic 200000
+
+The case set is synthetic records over the ``features`` schema plus any
+``--cases`` CSVs of raw historical records. Every case is labelled with the
+teacher's full probability vector; the student learns those soft targets
+by expanding each case into one weighted row per class the teacher gives
+non-negligible mass (cross-entropy against the soft distribution).
+
+Writes ``model_student_E.pkl`` together with copies of the teacher's feature
+encoders and class list, so the ``student_E`` profile is a drop-in
+replacement. Prints teacher/student agreement and speedup on a holdout.
+"""
+
+import argparse
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import LabelEncoder
+from xgboost import XGBClassifier
+
+from inference.encoding import BatchEncoder
+from inference.parity import accuracy_delta, print_report
+from inference.profiles import PROFILE_ARTIFACTS, artifact_path, get_profile
+from inference.sampling import synthetic_records
+
+STUDENT = PROFILE_ARTIFACTS["student_E"]
+
+
+def build_cases(n_synthetic, case_files, seed=0):
+    frames = [synthetic_records(n_synthetic, seed=seed)]
+    frames += [pd.read_csv(path) for path in case_files]
+    return pd.concat(frames, ignore_index=True)
+
+
+def soft_label_rows(X, soft, min_prob=1e-3):
+    """Expand (N, d) inputs with (N, K) soft targets into weighted hard-label rows."""
+    n_classes = soft.shape[1]
+    rows, labels = np.nonzero(soft >= min_prob)
+    # XGBoost needs every class present at least once
+    missing = np.setdiff1d(np.arange(n_classes), labels)
+    if len(missing):
+        rows = np.concatenate([rows, soft[:, missing].argmax(axis=0)])
+        labels = np.concatenate([labels, missing])
+    return X[rows], labels, soft[rows, labels]
+
+
+def train_student(X, soft, n_estimators=300, max_depth=6, learning_rate=0.1, n_jobs=None):
+    X_rep, y_rep, w_rep = soft_label_rows(X, soft)
+    student = XGBClassifier(
+        n_estimators=n_estimators,
+        max_depth=max_depth,
+        learning_rate=learning_rate,
+        objective="multi:softprob",
+        tree_method="hist",
+        n_jobs=n_jobs,
+    )
+    student.fit(X_rep, y_rep, sample_weight=w_rep)
+    return student
+
+
+def median_ms(fn, X, repeat=20):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(X)
+        times.append(time.perf_counter() - start)
+    return float(np.median(times) * 1000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--teacher", default="bi_lstm_E", help="profile to distill (e.g. bi_lstm_E, n)")
+    parser.add_argument("--cases", nargs="*", default=[], help="CSVs of raw historical records")
+    parser.add_argument("--n-synthetic", type=int, default=100000)
+    parser.add_argument("--holdout", type=float, default=0.1)
+    parser.add_argument("--n-estimators", type=int, default=300)
+    parser.add_argument("--max-depth", type=int, default=6)
+    args = parser.parse_args()
+
+    teacher = get_profile(args.teacher)
+    class_names = np.asarray(teacher.class_names)
+    if not np.array_equal(np.sort(class_names), class_names):
+        raise ValueError(f"Teacher {args.teacher} classes are not in LabelEncoder order")
+
+    cases = build_cases(args.n_synthetic, args.cases)
+    print(f"Labelling {len(cases)} cases with teacher {args.teacher}")
+    soft = teacher.predict_proba(teacher.encode(cases))
+
+    encoder = BatchEncoder(teacher.encoders, dtype=STUDENT["dtype"])
+    X = encoder.encode(cases)
+    rng = np.random.default_rng(0)
+    test = rng.random(len(X)) < args.holdout
+
+    start = time.perf_counter()
+    student = train_student(X[~test], soft[~test], args.n_estimators, args.max_depth)
+    print(f"Trained student in {time.perf_counter() - start:.1f}s")
+
+    joblib.dump(student, artifact_path(STUDENT["model"]))
+    joblib.dump(teacher.encoders, artifact_path(STUDENT["encoders"]))
+    joblib.dump(LabelEncoder().fit(class_names), artifact_path(STUDENT["label_encoder_y"]))
+    print(f"Wrote {STUDENT['model']}, {STUDENT['encoders']}, {STUDENT['label_encoder_y']}")
+
+    print_report(accuracy_delta(soft[test], student.predict_proba(X[test]), class_names))
+
+    cases_test = cases[test].reset_index(drop=True)
+    for n in (1, 1024):
+        batch = cases_test.iloc[:n]
+        t_ms = median_ms(lambda b: teacher.predict_proba(teacher.encode(b)), batch)
+        s_ms = median_ms(lambda b: student.predict_proba(encoder.encode(b)), batch)
+        print(f"{n:>5} rows: teacher {t_ms:.2f}ms, student {s_ms:.2f}ms ({t_ms / s_ms:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
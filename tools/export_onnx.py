@@ -0,0 +1,157 @@
+"""Export model profiles (model + feature encoders) to single ONNX graphs.
+
+Usage:
+    python -m tools.export_onnx                   # every available profile
+    python -m tools.export_onnx dengue best_small_E
+
+Each profile is written next to its model as ``<model stem>.onnx`` and is
+served by ``inference.onnx_backend.OnnxServing`` when ``SVP_BACKEND=onnx``.
+Check the exports against the native models with ``python -m tools.onnx_parity``.
+"""
+
+import argparse
+import json
+import os
+
+import joblib
+import numpy as np
+from onnx import TensorProto, compose, helper
+
+from inference.introspection import used_feature_indices
+from inference.onnx_backend import FEATURES_TENSOR, PROBABILITIES
+from inference.profiles import PROFILE_ARTIFACTS, artifact_path, available_profiles, load_model, onnx_artifact
+from inference.schema import features, numeric_features
+
+# Highest opset the XGBoost converter supports
+TARGET_OPSET = 15
+# LabelEncoder keys_strings/values_int64s need ai.onnx.ml >= 2
+ML_OPSET = 3
+
+
+def _sklearn_to_onnx(model):
+    from skl2onnx import convert_sklearn
+    from skl2onnx.common.data_types import FloatTensorType
+
+    initial_types = [(FEATURES_TENSOR, FloatTensorType([None, len(features)]))]
+    onx = convert_sklearn(model, initial_types=initial_types, options={id(model): {"zipmap": False}},
+                          target_opset={"": TARGET_OPSET, "ai.onnx.ml": ML_OPSET})
+    return onx, "probabilities"
+
+
+def _xgboost_to_onnx(model):
+    import copy
+
+    from onnxmltools import convert_xgboost
+    from onnxmltools.convert.common.data_types import FloatTensorType
+
+    # The converter only understands the default f0..fN feature names
+    model = copy.deepcopy(model)
+    model.get_booster().feature_names = None
+    initial_types = [(FEATURES_TENSOR, FloatTensorType([None, len(features)]))]
+    return convert_xgboost(model, initial_types=initial_types, target_opset=TARGET_OPSET), "probabilities"
+
+
+def _keras_to_onnx(model):
+    import tensorflow as tf
+    import tf2onnx
+
+    spec = [tf.TensorSpec([None, len(features)], tf.float32, name=FEATURES_TENSOR)]
+    fn = tf.function(lambda x: model(x, training=False), input_signature=spec)
+    onx, _ = tf2onnx.convert.from_function(fn, input_signature=spec, opset=TARGET_OPSET)
+    return onx, onx.graph.output[0].name
+
+
+def model_to_onnx(model):
+    """Convert a native model; return ``(ModelProto, probability output name)``."""
+    module = type(model).__module__.split(".")[0]
+    if module == "xgboost":
+        return _xgboost_to_onnx(model)
+    if module in ("keras", "tensorflow", "tf_keras"):
+        return _keras_to_onnx(model)
+    if module == "sklearn":
+        return _sklearn_to_onnx(model)
+    raise TypeError(f"No ONNX converter for {type(model).__name__}")
+
+
+def encoder_graph(encoders, dtype, opset_imports, ir_version):
+    """Raw columns -> label codes / numeric values -> (N, 56) float ``features`` tensor."""
+    inputs, nodes, columns = [], [], []
+    for name in features:
+        if name in encoders:
+            classes = np.asarray(encoders[name].classes_).astype(str).tolist()
+            inputs.append(helper.make_tensor_value_info(name, TensorProto.STRING, [None, 1]))
+            nodes.append(helper.make_node(
+                "LabelEncoder", [name], [f"{name}_code"], domain="ai.onnx.ml",
+                keys_strings=classes, values_int64s=list(range(len(classes))), default_int64=-1,
+            ))
+            nodes.append(helper.make_node("Cast", [f"{name}_code"], [f"{name}_value"], to=TensorProto.FLOAT))
+        elif name in numeric_features:
+            inputs.append(helper.make_tensor_value_info(name, TensorProto.FLOAT, [None, 1]))
+            if np.issubdtype(dtype, np.integer):
+                # Same truncation as DataFrame.astype(np.int32) in the apps
+                nodes.append(helper.make_node("Cast", [name], [f"{name}_int"], to=TensorProto.INT32))
+                nodes.append(helper.make_node("Cast", [f"{name}_int"], [f"{name}_value"], to=TensorProto.FLOAT))
+            else:
+                nodes.append(helper.make_node("Identity", [name], [f"{name}_value"]))
+        columns.append(f"{name}_value")
+    nodes.append(helper.make_node("Concat", columns, [FEATURES_TENSOR], axis=1))
+    output = helper.make_tensor_value_info(FEATURES_TENSOR, TensorProto.FLOAT, [None, len(features)])
+    graph = helper.make_graph(nodes, "encoders", inputs, [output])
+    return helper.make_model(graph, opset_imports=opset_imports, ir_version=ir_version)
+
+
+def export_profile(name):
+    spec = PROFILE_ARTIFACTS[name]
+    model = load_model(spec["model"])
+    encoders = joblib.load(artifact_path(spec["encoders"]))
+    if spec["label_encoder_y"] is not None:
+        class_names = joblib.load(artifact_path(spec["label_encoder_y"])).classes_
+    else:
+        class_names = model.classes_
+    model_onnx, prob_output = model_to_onnx(model)
+
+    # merge_models needs both graphs on the same IR version and opsets
+    opsets = {o.domain: o.version for o in model_onnx.opset_import}
+    opsets.setdefault("", TARGET_OPSET)
+    opsets["ai.onnx.ml"] = max(opsets.get("ai.onnx.ml", 0), ML_OPSET)
+    opset_imports = [helper.make_opsetid(d, v) for d, v in opsets.items()]
+    del model_onnx.opset_import[:]
+    model_onnx.opset_import.extend(opset_imports)
+    pre = encoder_graph(encoders, spec["dtype"], opset_imports, model_onnx.ir_version)
+    merged = compose.merge_models(pre, model_onnx, io_map=[(FEATURES_TENSOR, model_onnx.graph.input[0].name)],
+                                  outputs=[prob_output])
+
+    if prob_output != PROBABILITIES:
+        merged.graph.node.append(helper.make_node("Identity", [prob_output], [PROBABILITIES]))
+    del merged.graph.output[:]
+    merged.graph.output.append(helper.make_tensor_value_info(PROBABILITIES, TensorProto.FLOAT, [None, None]))
+
+    # What the profile loader would otherwise read from the native artifacts
+    helper.set_model_props(merged, {
+        "class_names": json.dumps(np.asarray(class_names).astype(str).tolist()),
+        "used_features": json.dumps(used_feature_indices(model).tolist()),
+    })
+
+    path = onnx_artifact(name)
+    with open(path, "wb") as f:
+        f.write(merged.SerializeToString())
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("profiles", nargs="*", help="profile names (default: all available)")
+    args = parser.parse_args()
+
+    names = args.profiles or [n for n in available_profiles() if not PROFILE_ARTIFACTS[n]["model"].endswith(".tflite")]
+    for name in names:
+        try:
+            path = export_profile(name)
+        except Exception as e:
+            print(f"{name}: export failed: {e}")
+            continue
+        print(f"{name}: wrote {path} ({os.path.getsize(path) / 1e6:.2f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Export the Bi-LSTM classifier to a quantized TFLite artifact.
+
+Usage:
+    python -m tools.export_tflite                       # int8 weights -> model_bi_lstm_best_E.tflite
+    python -m tools.export_tflite --mode float16 --cases cases.csv
+
+``--mode int8`` stores weights as int8 with float activations (dynamic-range
+quantization); ``--mode float16`` halves the weights only. After export the
+tool prints an accuracy-delta report of the TFLite model against the Keras
+original over synthetic records, or over ``--cases`` (a CSV of raw records
+with the ``features`` columns). The artifact is picked up by the
+``bi_lstm_E_tflite`` profile.
+"""
+
+import argparse
+import os
+import tempfile
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from inference.encoding import BatchEncoder
+from inference.parity import accuracy_delta, print_report
+from inference.profiles import PROFILE_ARTIFACTS, artifact_path, load_model
+from inference.sampling import synthetic_records
+from inference.tflite_backend import TFLiteServing
+
+
+def convert(model, mode="int8", batch_size=1):
+    import tensorflow as tf
+
+    spec = tf.TensorSpec((batch_size,) + tuple(model.input_shape[1:]), tf.float32)
+    with tempfile.TemporaryDirectory() as saved_model_dir:
+        # Recurrent layers only convert with a static batch dimension
+        model.export(saved_model_dir, format="tf_saved_model", input_signature=[spec], verbose=False)
+        converter = tf.lite.TFLiteConverter.from_saved_model(saved_model_dir)
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        if mode == "float16":
+            converter.target_spec.supported_types = [tf.float16]
+        return converter.convert()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profile", default="bi_lstm_E")
+    parser.add_argument("--mode", choices=["int8", "float16"], default="int8")
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--output", default=PROFILE_ARTIFACTS["bi_lstm_E_tflite"]["model"])
+    parser.add_argument("--cases", help="CSV of raw records to compare on (default: synthetic)")
+    parser.add_argument("--n", type=int, default=5000, help="number of synthetic records")
+    args = parser.parse_args()
+
+    spec = PROFILE_ARTIFACTS[args.profile]
+    model = load_model(spec["model"])
+    output = artifact_path(args.output)
+    with open(output, "wb") as f:
+        f.write(convert(model, args.mode, args.batch_size))
+    source_size = os.path.getsize(artifact_path(spec["model"]))
+    print(f"Wrote {output} ({os.path.getsize(output) / 1e6:.2f} MB, source {source_size / 1e6:.2f} MB)")
+
+    records = pd.read_csv(args.cases) if args.cases else synthetic_records(args.n)
+    encoders = joblib.load(artifact_path(spec["encoders"]))
+    class_names = np.asarray(joblib.load(artifact_path(spec["label_encoder_y"])).classes_).astype(str)
+    X = BatchEncoder(encoders, dtype=spec["dtype"]).encode(records).astype(np.float32)
+
+    reference = model.predict(X, batch_size=1024, verbose=0)
+    candidate = TFLiteServing(output).predict_proba(X)
+    print_report(accuracy_delta(reference, candidate, class_names))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Build the symptom-profile frequency table used for cache warmup.
+
+Usage:
+    python -m tools.frequency_table --cases 2023.csv 2024.csv
+    python -m tools.frequency_table --n-synthetic 100000     # no history at hand
+
+Encodes raw historical records with the multiclass profile's encoders,
+counts each distinct encoded input and writes them most frequent first to
+``profile_frequencies.csv`` (read by ``inference.warmup`` at startup).
+"""
+
+import argparse
+
+import pandas as pd
+
+from inference.encoding import BatchEncoder
+from inference.profiles import get_profile
+from inference.sampling import synthetic_records
+from inference.schema import features
+from inference.warmup import WARMUP_TABLE
+
+
+def frequency_table(records, encoders):
+    X = BatchEncoder(encoders, dtype=float).encode(records)
+    encoded = pd.DataFrame(X, columns=features)
+    counts = encoded.value_counts(sort=True).rename("count").reset_index()
+    return counts[features + ["count"]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", nargs="*", default=[], help="CSVs of raw historical records")
+    parser.add_argument("--n-synthetic", type=int, default=0)
+    parser.add_argument("--profile", default="best_small_E", help="profile whose encoders to use")
+    parser.add_argument("--out", default=WARMUP_TABLE)
+    args = parser.parse_args()
+
+    frames = [pd.read_csv(path) for path in args.cases]
+    if args.n_synthetic:
+        frames.append(synthetic_records(args.n_synthetic))
+    if not frames:
+        parser.error("give --cases and/or --n-synthetic")
+    records = pd.concat(frames, ignore_index=True)
+
+    table = frequency_table(records, get_profile(args.profile).encoders)
+    table.to_csv(args.out, index=False)
+    top = table["count"].head(1000).sum() / table["count"].sum()
+    print(f"Wrote {args.out}: {len(table)} distinct profiles from {len(records)} records; "
+          f"top 1000 cover {100 * top:.1f}%")
+
+
+if __name__ == "__main__":
+    main()
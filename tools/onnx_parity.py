@@ -0,0 +1,60 @@
+"""Parity suite: ONNX exports vs. the native models they were built from.
+
+Usage:
+    python -m tools.onnx_parity                  # every profile with an .onnx export
+    python -m tools.onnx_parity dengue --n 20000
+
+For each profile, scores the same records three ways: native model on the
+Python-encoded matrix, the ONNX graph end to end from raw records, and the
+ONNX model part on the encoded matrix. Exits non-zero when top-1 agreement
+or the largest probability difference falls outside tolerance.
+"""
+
+import argparse
+import os
+import sys
+
+from inference.parity import accuracy_delta, print_report
+from inference.profiles import PROFILE_ARTIFACTS, available_profiles, load_profile, onnx_artifact
+from inference.sampling import synthetic_records
+
+
+def check_profile(name, records, min_agreement, max_delta):
+    native = load_profile(name, backend="native")
+    onnx = load_profile(name, backend="onnx")
+    reference = native.predict_proba(native.encode(records))
+
+    ok = True
+    for label, candidate in (
+        ("raw records", onnx.predict_records(records)),
+        ("encoded matrix", onnx.predict_proba(onnx.encode(records))),
+    ):
+        report = accuracy_delta(reference, candidate, native.class_names)
+        passed = report["top1_agreement"] >= min_agreement and report["max_abs_delta"] <= max_delta
+        print(f"--- {name} ({label}): {'PASS' if passed else 'FAIL'}")
+        print_report(report)
+        ok &= passed
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("profiles", nargs="*")
+    parser.add_argument("--n", type=int, default=5000)
+    parser.add_argument("--min-agreement", type=float, default=0.999)
+    parser.add_argument("--max-delta", type=float, default=1e-4)
+    args = parser.parse_args()
+
+    names = args.profiles or [
+        n for n in available_profiles()
+        if not PROFILE_ARTIFACTS[n]["model"].endswith(".tflite") and os.path.exists(onnx_artifact(n))
+    ]
+    records = synthetic_records(args.n)
+    results = {name: check_profile(name, records, args.min_agreement, args.max_delta) for name in names}
+    failed = [name for name, ok in results.items() if not ok]
+    print(f"{len(results) - len(failed)}/{len(results)} profiles match")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()